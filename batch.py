@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import random
+from pathlib import Path
+from threading import Event
+
+from json_values import to_json_value
+from variant_plan import round_params, variant_rng
+from video_modifier import VideoModifier, run_render_jobs
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv'}
+
+# Modifier settings that shape the drawn parameters
+EFFECT_SETTINGS = ('use_speed', 'use_color', 'use_border', 'use_zoom',
+                   'zoom_min', 'zoom_max', 'speed_min', 'speed_max')
+
+
+def collect_inputs(source):
+    """List input videos from a directory or a manifest file.
+
+    A manifest is either a JSON list of paths or a text file with one
+    path per line; relative paths are resolved against the manifest's
+    directory.
+    """
+    source = Path(source)
+    if source.is_dir():
+        return sorted(
+            str(path) for path in source.iterdir()
+            if path.is_file() and path.suffix.lower() in VIDEO_EXTENSIONS
+        )
+
+    text = source.read_text()
+    if source.suffix.lower() == '.json':
+        entries = json.loads(text)
+    else:
+        entries = [
+            line.strip() for line in text.splitlines()
+            if line.strip() and not line.strip().startswith('#')
+        ]
+    return [str((source.parent / entry).resolve()) for entry in entries]
+
+
+class JobJournal:
+    """Append-only record of finished (input, version) jobs, one JSON object per line.
+
+    The first line is a header holding the batch's seed and settings, so
+    a resumed run can reuse the seed and refuse settings that would make
+    the earlier outputs stale.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def read_header(self):
+        """Return the journal's header, or None for a journal that doesn't exist yet"""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return None
+
+        with open(self.path) as journal:
+            try:
+                entry = json.loads(journal.readline())
+            except ValueError:
+                entry = {}
+        if 'header' not in entry:
+            raise ValueError(f"{self.path} has no batch header; use a new journal")
+        return entry['header']
+
+    def write_header(self, header):
+        self.record({'header': header})
+
+    def load(self):
+        """Return finished jobs keyed by (input, index), skipping outputs that went missing"""
+        completed = {}
+        if not self.path.exists():
+            return completed
+
+        with open(self.path) as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from an interrupted run
+                    continue
+                if 'header' in entry:
+                    continue
+                if os.path.exists(entry['output_path']):
+                    completed[(entry['input'], entry['index'])] = entry
+        return completed
+
+    def record(self, entry):
+        with open(self.path, 'a') as journal:
+            journal.write(json.dumps(entry) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+
+class BatchRunner:
+    """Schedule (input, version) render jobs for many inputs over a process pool.
+
+    Shorter clips are scheduled first. Finished jobs are written to a
+    journal in the output directory, so a rerun resumes where an
+    interrupted one stopped. Each job's parameters are derived from
+    seed, the input's path and the version index. Without a seed, a
+    resumed run reuses the journal's, and a run whose seed or settings
+    differ from the journal's is refused.
+    """
+
+    def __init__(self, inputs, output_dir, versions_per_input=5, workers=1,
+                 journal_path=None, modifier_options=None, seed=None,
+                 progress_callback=None, status_callback=None):
+        self.inputs = [str(Path(path).resolve()) for path in inputs]
+        self.output_dir = Path(output_dir).resolve()
+        self.versions_per_input = versions_per_input
+        self.workers = max(1, workers)
+        self.journal = JobJournal(journal_path or self.output_dir / "batch_journal.jsonl")
+        self.modifier_options = modifier_options or {}
+        self.seed = seed
+        self.progress_callback = progress_callback
+        self.status_callback = status_callback
+        self.cancel_event = Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def input_label(self, input_path):
+        """Name for an input's output directory and random streams.
+
+        The stem alone is not unique (a/x.mp4 and b/x.mp4), so a short
+        hash of the resolved path is appended.
+        """
+        input_path = Path(input_path)
+        digest = hashlib.sha256(str(input_path.resolve()).encode()).hexdigest()[:8]
+        return f"{input_path.stem}-{digest}"
+
+    def get_output_path(self, input_path, index):
+        """Stable per-job output path, so the journal can match it on resume"""
+        input_path = Path(input_path)
+        return str(self.output_dir / self.input_label(input_path) / f"{input_path.stem}_v{index + 1:03d}{input_path.suffix}")
+
+    def open_inputs(self):
+        """Open every input once, shortest first, as (input path, modifier) pairs"""
+        clips = []
+        for input_path in self.inputs:
+            modifier = VideoModifier(input_path, **self.modifier_options)
+            modifier.cap.release()
+            duration = modifier.frame_count / modifier.fps if modifier.fps else 0
+            clips.append((duration, input_path, modifier))
+        clips.sort(key=lambda clip: clip[0])
+        return [(input_path, modifier) for _, input_path, modifier in clips]
+
+    def resume(self, modifier):
+        """Check this run against the journal's header, writing one for a new journal.
+
+        Every input shares the modifier options, so any one modifier
+        stands for the batch's settings.
+        """
+        settings = modifier.get_settings()
+        header = {
+            'output': modifier.output_settings(),
+            'effects': {name: settings[name] for name in EFFECT_SETTINGS}
+        }
+        previous = self.journal.read_header()
+
+        if previous is None:
+            if self.seed is None:
+                self.seed = random.SystemRandom().randrange(2 ** 32)
+            self.journal.write_header(dict(header, seed=self.seed))
+            return
+
+        if self.seed is None:
+            self.seed = previous['seed']
+        elif self.seed != previous['seed']:
+            raise ValueError(
+                f"{self.journal.path} was written with seed {previous['seed']}, not {self.seed}; "
+                "use a new output directory or journal"
+            )
+        changed = sorted(
+            name for name in header
+            if to_json_value(header[name]) != previous.get(name)
+        )
+        if changed:
+            raise ValueError(
+                f"{self.journal.path} was written with different {' and '.join(changed)} settings; "
+                "use a new output directory or journal"
+            )
+
+    def plan_jobs(self, clips, completed):
+        """Build the pending job list from the opened inputs"""
+        jobs = []
+        for input_path, modifier in clips:
+            settings = modifier.get_settings()
+            for index in range(self.versions_per_input):
+                if (input_path, index) in completed:
+                    continue
+                rng = variant_rng(self.seed, index, source=self.input_label(input_path))
+                jobs.append({
+                    'input': input_path,
+                    'index': index,
+                    'output_path': self.get_output_path(input_path, index),
+                    'settings': settings,
+                    'params': round_params(modifier.generate_variant_params(rng))
+                })
+        return jobs
+
+    def run(self):
+        """Render all pending jobs and return every finished job, including earlier runs"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        clips = self.open_inputs()
+        if clips:
+            self.resume(clips[0][1])
+        completed = self.journal.load()
+        jobs = self.plan_jobs(clips, completed)
+
+        if self.status_callback:
+            self.status_callback(
+                f"{len(jobs)} jobs pending, {len(completed)} already done "
+                f"({len(self.inputs)} inputs, {self.workers} workers, seed {self.seed})"
+            )
+
+        for job in jobs:
+            Path(job['output_path']).parent.mkdir(parents=True, exist_ok=True)
+
+        progress = [0.0] * len(jobs)
+
+        def handle_event(kind, index, value):
+            job = jobs[index]
+            if kind == 'started' and self.status_callback:
+                self.status_callback(f"Rendering {Path(job['input']).name} version {job['index'] + 1}...")
+            elif kind == 'progress':
+                progress[index] = value
+                if self.progress_callback:
+                    self.progress_callback(sum(progress) / len(jobs))
+
+        def handle_done(index, result):
+            job = jobs[index]
+            entry = {
+                'input': job['input'],
+                'index': job['index'],
+                'output_path': result['output_path'],
+                'seed': self.seed,
+                'params': job['params'],
+                'metrics': result['metrics']
+            }
+            self.journal.record(entry)
+            completed[(job['input'], job['index'])] = entry
+
+        if jobs:
+            run_render_jobs(
+                [(job['settings'], job['output_path'], job['params']) for job in jobs],
+                self.workers,
+                self.cancel_event,
+                handle_event,
+                handle_done
+            )
+
+        if self.status_callback:
+            if self.is_cancelled():
+                self.status_callback("Batch cancelled, finished jobs are kept in the journal")
+            else:
+                self.status_callback("Batch completed!")
+
+        return sorted(completed.values(), key=lambda entry: (entry['input'], entry['index']))
@@ -0,0 +1,379 @@
+"""Reproducible benchmarks for video generation and comparison.
+
+    python benchmark.py                          # quick run: 10 s clips
+    python benchmark.py --full                   # 10 s, 60 s and 3 min clips
+    python benchmark.py --save baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.1
+    python benchmark.py --repeats 5              # median of 5 runs per result
+    python benchmark.py --writers opencv ffmpeg  # also time the ffmpeg encoder
+    python benchmark.py --memory                 # also measure memory with and without the buffer pool
+
+Test clips are synthesized deterministically from a seed, so every run
+measures the same pixels. Each effect is timed on its own and the full
+pipeline with all effects on, plus comparison throughput. Results are
+frames (or sample pairs) per second, from the median of --repeats runs
+made in rounds over all benchmarks, so neither a run slowed by other
+load nor an unusually fast one decides a result. Every writer backend
+in --writers renders the full pipeline; the others use the OpenCV
+writer. With --memory,
+the full pipeline is also rendered in a fresh process per mode, with and
+without the buffer pool, reporting peak RSS and the memory allocated per
+frame. With --baseline, any result more than --threshold slower than the
+baseline is reported as a regression and the exit code is 1.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from video_analyzer import VideoAnalyzer
+from video_modifier import VideoModifier
+
+RESOLUTIONS = {
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    'vertical': (1080, 1920)
+}
+QUICK_DURATIONS = [10]
+FULL_DURATIONS = [10, 60, 180]
+
+# Each effect alone, then everything together
+EFFECTS = {
+    'none': {},
+    'speed': {'use_speed': True},
+    'speed_resample': {'use_speed': True, 'speed_mode': 'resample'},
+    'zoom': {'use_zoom': True},
+    'color': {'use_color': True},
+    'border': {'use_border': True},
+    'full': {'use_speed': True, 'use_zoom': True, 'use_color': True, 'use_border': True}
+}
+
+# Fixed variant parameters, so every run does the same work
+BENCHMARK_PARAMS = {
+    'speed_factor': 1.2,
+    'zoom_factor': 1.05,
+    'hue_shift': 8,
+    'saturation_factor': 1.05,
+    'brightness_factor': 0.95,
+    'border_size': 3,
+    'border_color': (20, 30, 40)
+}
+
+# Fast bulk-run settings for each writer backend
+WRITER_OPTIONS = {
+    'opencv': {},
+    'ffmpeg': {'codec': 'libx264', 'preset': 'veryfast', 'crf': 23}
+}
+
+
+def color_float_reference(frame, hue_shift, saturation_factor, brightness_factor):
+    """Original per-frame float32 HSV round trip, kept as the benchmark baseline"""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    hsv = hsv.astype(np.float32)
+
+    hsv[:, :, 0] = (hsv[:, :, 0] + hue_shift) % 180
+    hsv[:, :, 1] = np.clip(hsv[:, :, 1] * saturation_factor, 0, 255)
+    hsv[:, :, 2] = np.clip(hsv[:, :, 2] * brightness_factor, 0, 255)
+
+    hsv = hsv.astype(np.uint8)
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+
+def color_lut(frame, lut):
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    hsv = cv2.LUT(hsv, lut)
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+
+def time_call(func, *args, repeats=50):
+    func(*args)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(*args)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def benchmark_color(width=1080, height=1920, repeats=50):
+    """Compare the float32 HSV color step against the lookup-table engine"""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    hue_shift, saturation_factor, brightness_factor = 12, 1.07, 0.93
+
+    lut = VideoModifier.build_color_lut(hue_shift, saturation_factor, brightness_factor)
+    reference = color_float_reference(frame, hue_shift, saturation_factor, brightness_factor)
+    max_diff = int(np.max(cv2.absdiff(reference, color_lut(frame, lut))))
+
+    float_ms = time_call(color_float_reference, frame, hue_shift,
+                         saturation_factor, brightness_factor, repeats=repeats)
+    lut_ms = time_call(color_lut, frame, lut, repeats=repeats)
+
+    return {
+        'frame': f"{width}x{height}",
+        'float_ms': float_ms,
+        'lut_ms': lut_ms,
+        'speedup': float_ms / lut_ms,
+        'max_diff': max_diff
+    }
+
+
+def synthesize_clip(path, width, height, seconds, fps=30, seed=0):
+    """Write a deterministic test clip: moving gradient, shapes and fixed noise"""
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 24, (height, width, 3), dtype=np.uint8)
+    shapes = [
+        (rng.integers(0, width), rng.integers(0, height), rng.integers(20, max(21, width // 6)),
+         tuple(int(c) for c in rng.integers(0, 256, 3)))
+        for _ in range(6)
+    ]
+    ramp_x = np.linspace(0, 255, width, dtype=np.float32)
+    ramp_y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for index in range(int(seconds * fps)):
+        phase = index * 4
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[:, :, 0] = (ramp_x + phase) % 256
+        frame[:, :, 1] = (ramp_y + phase / 2) % 256
+        frame[:, :, 2] = 128
+        frame = cv2.add(frame, noise)
+        for x, y, radius, color in shapes:
+            center = (int(x + index * 3) % width, int(y + index * 2) % height)
+            cv2.circle(frame, center, int(radius), color, -1)
+        writer.write(frame)
+    writer.release()
+
+
+def get_clip(clips_dir, name, seconds):
+    """Return the path of a synthetic clip, creating it on first use"""
+    width, height = RESOLUTIONS[name]
+    path = Path(clips_dir) / f"synthetic_{name}_{seconds}s.mp4"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        synthesize_clip(path, width, height, seconds)
+    return path
+
+
+def benchmark_generation(clip_path, output_dir, effect, writer='opencv'):
+    """Render one variant with a single effect set and return its stage metrics"""
+    options = {'use_speed': False, 'use_color': False, 'use_border': False, 'use_zoom': False}
+    options.update(EFFECTS[effect])
+    modifier = VideoModifier(str(clip_path), writer=writer, writer_options=WRITER_OPTIONS[writer], **options)
+
+    output_path = str(Path(output_dir) / f"{Path(clip_path).stem}_{effect}_{writer}.mp4")
+    modifier.generate_modified_video(output_path, BENCHMARK_PARAMS)
+    return modifier.metrics[output_path]
+
+
+def peak_rss_mb():
+    """High-water resident set size of this process, or None where it isn't available"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure_memory(clip_path, output_dir, buffer_pool):
+    """Render the full pipeline under tracemalloc and report its memory use.
+
+    Python-side allocations, including every array NumPy and OpenCV
+    create, are traced. After each frame the peak traced memory above
+    what was live when the frame started is added up, giving the
+    memory allocated per frame.
+    """
+    frame_peaks = []
+    state = {'start': 0, 'peak': 0}
+
+    def frame_done(_progress):
+        current, peak = tracemalloc.get_traced_memory()
+        frame_peaks.append(peak - state['start'])
+        state['peak'] = max(state['peak'], peak)
+        state['start'] = current
+        tracemalloc.reset_peak()
+
+    modifier = VideoModifier(clip_path, progress_callback=frame_done, buffer_pool=buffer_pool)
+    output_path = str(Path(output_dir) / f"{Path(clip_path).stem}_memory_{buffer_pool}.mp4")
+    tracemalloc.start()
+    state['start'] = tracemalloc.get_traced_memory()[0]
+    modifier.generate_modified_video(output_path, BENCHMARK_PARAMS)
+    tracemalloc.stop()
+
+    # The first frame also creates long-lived state (buffers, lookup tables)
+    steady = frame_peaks[1:] or frame_peaks
+    return {
+        'buffer_pool': buffer_pool,
+        'frames': len(frame_peaks),
+        'peak_rss_mb': peak_rss_mb(),
+        'traced_peak_mb': state['peak'] / (1 << 20),
+        'allocated_mb_per_frame': sum(steady) / len(steady) / (1 << 20),
+        'first_frame_mb': frame_peaks[0] / (1 << 20) if frame_peaks else 0.0
+    }
+
+
+def benchmark_memory(clip_path, output_dir, buffer_pool):
+    """Run measure_memory in a fresh process, so peak RSS belongs to that render alone"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure_memory, str(clip_path), str(output_dir), buffer_pool).result()
+
+
+def median_run(runs):
+    """Stage metrics of the median run (by fps) of several runs of one benchmark, with every run's fps"""
+    median = sorted(runs, key=lambda metrics: metrics['fps'])[len(runs) // 2]
+    return dict(median, runs_fps=[metrics['fps'] for metrics in runs])
+
+
+def benchmark_comparison(clip_path, variant_path):
+    """Time analyze_videos on a clip and one of its variants"""
+    analyzer = VideoAnalyzer(str(clip_path), str(variant_path))
+    analyzer.analyze_videos()
+    return analyzer.metrics
+
+
+def generation_result(metrics):
+    return {
+        'fps': metrics['fps'],
+        'runs_fps': metrics['runs_fps'],
+        'wall_s': metrics['wall_s'],
+        'stages_ms': {
+            stage: values['ms_per_call']
+            for stage, values in metrics['stages'].items()
+        }
+    }
+
+
+def run_suite(clips_dir, resolutions, durations, writers=('opencv',), memory=False, repeats=3, status=print):
+    results = {}
+
+    color = benchmark_color()
+    results['micro/color_lut'] = {'fps': 1000 / color['lut_ms'], 'speedup': color['speedup']}
+    status(f"micro/color_lut: {color['speedup']:.1f}x over float32 HSV")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name in resolutions:
+            for seconds in durations:
+                clip_path = get_clip(clips_dir, name, seconds)
+                clip = f"{name}_{seconds}s"
+
+                # Repeats run in rounds over every benchmark, so a slow spell of the
+                # machine costs one run of each rather than all runs of one
+                runs = {}
+                for _ in range(max(1, repeats)):
+                    for effect in EFFECTS:
+                        metrics = benchmark_generation(clip_path, output_dir, effect)
+                        runs.setdefault(f"generate/{clip}/{effect}", []).append(metrics)
+
+                    # End-to-end throughput per encoder, including the final flush
+                    for writer in writers:
+                        if writer == 'opencv':
+                            continue
+                        metrics = benchmark_generation(clip_path, output_dir, 'full', writer)
+                        runs.setdefault(f"generate/{clip}/full/{writer}", []).append(metrics)
+
+                    variant_path = Path(output_dir) / f"{clip_path.stem}_full_opencv.mp4"
+                    runs.setdefault(f"compare/{clip}", []).append(benchmark_comparison(clip_path, variant_path))
+
+                for key, key_runs in runs.items():
+                    metrics = median_run(key_runs)
+                    if key.startswith('compare/'):
+                        results[key] = {'fps': metrics['fps'], 'runs_fps': metrics['runs_fps'],
+                                        'wall_s': metrics['wall_s']}
+                        status(f"{key}: {metrics['fps']:.1f} sample pairs/s")
+                    else:
+                        results[key] = generation_result(metrics)
+                        status(f"{key}: {metrics['fps']:.1f} frames/s")
+
+                if memory:
+                    for buffer_pool in (False, True):
+                        result = benchmark_memory(clip_path, output_dir, buffer_pool)
+                        key = f"memory/{clip}/{'buffer_pool' if buffer_pool else 'allocating'}"
+                        results[key] = result
+                        rss = f"{result['peak_rss_mb']:.0f} MB" if result['peak_rss_mb'] is not None else "n/a"
+                        status(f"{key}: peak RSS {rss}, "
+                               f"{result['allocated_mb_per_frame']:.1f} MB allocated per frame")
+
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """Results whose throughput dropped more than threshold (a fraction) below the baseline"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous or not previous.get('fps'):
+            continue
+        change = result['fps'] / previous['fps'] - 1
+        if change < -threshold:
+            regressions.append({
+                'benchmark': key,
+                'baseline_fps': previous['fps'],
+                'fps': result['fps'],
+                'change': change
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark video generation and comparison")
+    parser.add_argument("--full", action="store_true", help="also run 60 s and 3 min clips")
+    parser.add_argument("--resolutions", nargs="+", choices=sorted(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument("--durations", nargs="+", type=int, default=None, help="clip lengths in seconds")
+    parser.add_argument("--writers", nargs="+", choices=sorted(WRITER_OPTIONS), default=['opencv'],
+                        help="writer backends to time on the full pipeline")
+    parser.add_argument("--memory", action="store_true",
+                        help="also measure peak RSS and per-frame allocations with and without the buffer pool")
+    parser.add_argument("--clips-dir", default=os.path.join(tempfile.gettempdir(), "video_benchmark_clips"),
+                        help="where synthetic clips are cached")
+    parser.add_argument("--save", default=None, help="write results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="JSON results of an earlier run to diff against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed slowdown against the baseline, as a fraction")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="runs per generation and comparison result; the median is reported")
+    args = parser.parse_args(argv)
+
+    durations = args.durations or (FULL_DURATIONS if args.full else QUICK_DURATIONS)
+    results = run_suite(args.clips_dir, args.resolutions, durations, args.writers, args.memory, args.repeats)
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'repeats': args.repeats
+        },
+        'results': results
+    }
+    if args.save:
+        with open(args.save, 'w') as save_file:
+            json.dump(report, save_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = find_regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['benchmark']}: {regression['baseline_fps']:.1f} -> "
+                  f"{regression['fps']:.1f} ({regression['change']:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+"""Headless command-line entry point for the video generator and comparison tool.
+
+    python -m cli generate input.mp4 -n 50 --speed 0.9:1.4 --zoom 0.8:1.1 --workers 8 --out dir/
+    python -m cli batch clips/ -n 20 --workers 8 --out dir/
+    python -m cli compare original.mp4 modified.mp4
+    python -m cli compare original.mp4 modified.mp4 --threshold 80
+    python -m cli compare-batch original.mp4 variants/*.mp4 --table
+    python -m cli index published.fpi published/
+    python -m cli search published.fpi new_variant.mp4 --compare
+    python -m cli serve --port 8765 --workers 2
+
+Heavy imports (OpenCV, NumPy) are deferred until a subcommand runs, and
+results are written to stdout as JSON.
+"""
+import argparse
+import json
+import shutil
+import sys
+from pathlib import Path
+
+from json_values import to_json_value
+
+
+def parse_range(value):
+    """Parse a 'min:max' range argument"""
+    try:
+        low, high = (float(part) for part in value.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MIN:MAX, got {value!r}")
+    if low > high:
+        raise argparse.ArgumentTypeError(f"range minimum is above maximum: {value!r}")
+    return low, high
+
+
+def print_status(message):
+    print(message, file=sys.stderr)
+
+
+def emit(result, indent=None):
+    json.dump(result, sys.stdout, indent=indent)
+    sys.stdout.write("\n")
+
+
+def write_metrics(args, metrics):
+    """Write the per-stage timing summary to --metrics, if given"""
+    if args.metrics:
+        with open(args.metrics, 'w') as metrics_file:
+            json.dump(to_json_value(metrics), metrics_file, indent=2)
+
+
+def modifier_options(args):
+    """VideoModifier keyword arguments from the shared effect options"""
+    speed_min, speed_max = args.speed
+    zoom_min, zoom_max = args.zoom
+    return {
+        'use_speed': not args.no_speed,
+        'use_color': not args.no_color,
+        'use_border': not args.no_border,
+        'use_zoom': not args.no_zoom,
+        'zoom_min': zoom_min,
+        'zoom_max': zoom_max,
+        'speed_min': speed_min,
+        'speed_max': speed_max,
+        'pipelined': args.pipelined,
+        'transform_workers': args.transform_workers,
+        'buffer_pool': args.buffer_pool,
+        'speed_mode': args.speed_mode,
+        'output_fps': args.output_fps,
+        'writer': args.writer,
+        'writer_options': writer_options(args),
+        'reader': args.reader,
+        'reader_threads': args.decoder_threads
+    }
+
+
+def writer_options(args):
+    """Encoder settings for the ffmpeg writer backend"""
+    if args.writer != 'ffmpeg':
+        return {}
+    return {
+        'codec': args.codec,
+        'preset': args.preset,
+        'crf': args.crf,
+        'threads': args.encoder_threads,
+        'audio': args.audio
+    }
+
+
+def run_generate(args):
+    from video_modifier import VideoModifier
+
+    modifier = VideoModifier(
+        args.input,
+        status_callback=None if args.quiet else print_status,
+        **modifier_options(args)
+    )
+    try:
+        versions = modifier.generate_multiple_versions(
+            args.num_versions,
+            single_pass=args.single_pass,
+            workers=args.workers,
+            output_dir=args.out,
+            segments=args.segments,
+            seed=args.seed
+        )
+    except KeyboardInterrupt:
+        modifier.cancel()
+        return 130
+
+    write_metrics(args, {version['output_path']: version['metrics'] for version in versions})
+    plan = modifier.plan
+    emit(to_json_value({
+        'input': args.input,
+        'seed': plan.seed,
+        'manifest': str(plan.manifest_path),
+        'rejected_duplicates': plan.rejected,
+        'versions': versions
+    }), args.indent)
+    return 0
+
+
+def run_batch(args):
+    from batch import BatchRunner, collect_inputs
+
+    inputs = collect_inputs(args.source)
+    runner = BatchRunner(
+        inputs,
+        args.out,
+        versions_per_input=args.num_versions,
+        workers=args.workers,
+        journal_path=args.journal,
+        modifier_options=modifier_options(args),
+        seed=args.seed,
+        status_callback=None if args.quiet else print_status
+    )
+    try:
+        completed = runner.run()
+    except KeyboardInterrupt:
+        runner.cancel()
+        return 130
+    except ValueError as error:
+        print_status(f"batch: {error}")
+        return 1
+
+    write_metrics(args, {entry['output_path']: entry.get('metrics') for entry in completed})
+    emit(to_json_value({'inputs': len(inputs), 'seed': runner.seed, 'completed': completed}), args.indent)
+    return 0
+
+
+def feature_cache(args):
+    """FeatureCache for --cache-dir, or None when caching is off"""
+    if not args.cache_dir:
+        return None
+    from feature_cache import FeatureCache
+    return FeatureCache(args.cache_dir, max_bytes=args.cache_size * 1024 ** 2)
+
+
+def run_compare(args):
+    from video_analyzer import VideoAnalyzer
+
+    analyzer = VideoAnalyzer(args.original, args.modified, frame_samples=args.samples,
+                             cache=feature_cache(args), sampling=args.sampling,
+                             workers=args.workers, reader=args.reader,
+                             reader_threads=args.decoder_threads)
+    if args.threshold is not None:
+        results = analyzer.analyze_progressive(args.threshold, args.confidence, args.min_samples)
+    else:
+        results = analyzer.analyze_videos()
+    write_metrics(args, analyzer.metrics)
+    emit(to_json_value({
+        'original': args.original,
+        'modified': args.modified,
+        'results': results,
+        'metrics': analyzer.metrics
+    }), args.indent)
+    return 0
+
+
+def run_compare_batch(args):
+    from video_analyzer import VideoAnalyzer
+
+    analyzer = VideoAnalyzer(frame_samples=args.samples, cache=feature_cache(args), sampling=args.sampling,
+                             workers=args.workers, reader=args.reader,
+                             reader_threads=args.decoder_threads)
+    ranking = analyzer.analyze_batch(args.original, args.candidates, args.threshold, args.confidence,
+                                     args.min_samples)
+    write_metrics(args, analyzer.metrics)
+
+    if args.table and args.threshold is not None:
+        print(f"{'rank':>4}  {'similarity':>10}  {'decision':>9}  {'samples':>7}  path")
+        for entry in ranking:
+            results = entry['results']
+            decision = results['decision'] if results['settled'] else results['decision'] + "?"
+            print(f"{entry['rank']:>4}  {results['overall_similarity']:>9.2f}%  {decision:>9}  "
+                  f"{results['samples_used']:>3}/{results['samples_max']:<3}  {entry['path']}")
+        return 0
+    if args.table:
+        print(f"{'rank':>4}  {'similarity':>10}  path")
+        for entry in ranking:
+            print(f"{entry['rank']:>4}  {entry['results']['overall_similarity']:>9.2f}%  {entry['path']}")
+        return 0
+
+    emit(to_json_value({
+        'original': args.original,
+        'ranking': ranking,
+        'metrics': analyzer.metrics
+    }), args.indent)
+    return 0
+
+
+def run_index(args):
+    from batch import VIDEO_EXTENSIONS, collect_inputs
+    from fingerprint import FingerprintIndex
+
+    index = FingerprintIndex(args.index, samples=args.samples)
+    added = 0
+    for source in args.sources:
+        if Path(source).suffix.lower() in VIDEO_EXTENSIONS:
+            paths = [source]
+        else:
+            paths = collect_inputs(source)
+        for path in paths:
+            if path in index:
+                continue
+            index.add(path)
+            added += 1
+            if not args.quiet:
+                print_status(f"Indexed {path}")
+
+    emit({'index': args.index, 'added': added, 'size': len(index)}, args.indent)
+    return 0
+
+
+def run_search(args):
+    from fingerprint import FingerprintIndex, find_matches
+
+    index = FingerprintIndex(args.index)
+    if not args.compare:
+        matches = index.query(args.video, args.max_distance, args.min_frames)
+        emit(to_json_value({'video': args.video, 'matches': matches}), args.indent)
+        return 0
+
+    from video_analyzer import VideoAnalyzer
+
+    analyzer = VideoAnalyzer(frame_samples=args.samples, cache=feature_cache(args), sampling=args.sampling,
+                             workers=args.workers, reader=args.reader,
+                             reader_threads=args.decoder_threads)
+    ranking = find_matches(index, args.video, analyzer, args.max_distance, args.min_frames)
+    write_metrics(args, analyzer.metrics)
+    emit(to_json_value({'video': args.video, 'ranking': ranking, 'metrics': analyzer.metrics}), args.indent)
+    return 0
+
+
+def run_serve(args):
+    from job_server import serve
+
+    serve(args.host, args.port, args.workers, args.max_queue, args.max_finished, status=print_status)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli", description="Headless video generator and comparison tool")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Options shared by every subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--indent", type=int, default=None, help="pretty-print JSON output")
+    common.add_argument("--metrics", default=None, metavar="PATH",
+                        help="also write per-stage timings and frames/sec to this JSON file")
+
+    # Decoder options shared by every subcommand that reads frames
+    decoding = argparse.ArgumentParser(add_help=False)
+    decoding.add_argument("--reader", choices=["opencv", "ffmpeg"], default="opencv",
+                          help="decode with cv2.VideoCapture or an ffmpeg subprocess that also scales frames")
+    decoding.add_argument("--decoder-threads", type=int, default=0,
+                          help="ffmpeg decoder threads (0: automatic)")
+
+    # Effect options shared by generate and batch
+    effects = argparse.ArgumentParser(add_help=False)
+    effects.add_argument("-n", "--num-versions", type=int, default=5)
+    effects.add_argument("--speed", type=parse_range, default=(0.9, 1.4), metavar="MIN:MAX")
+    effects.add_argument("--zoom", type=parse_range, default=(0.8, 1.1), metavar="MIN:MAX")
+    effects.add_argument("--workers", type=int, default=1, help="render versions in this many processes")
+    effects.add_argument("--speed-mode", choices=["fps", "resample"], default="fps",
+                         help="fps: write every frame at input fps x speed; resample: drop or repeat frames "
+                              "at a constant --output-fps, so only frames that are shown get transformed")
+    effects.add_argument("--output-fps", type=float, default=None,
+                         help="frame rate of resampled outputs (default: the input's)")
+    effects.add_argument("--pipelined", action="store_true",
+                         help="overlap decode, transform and encode on separate threads")
+    effects.add_argument("--transform-workers", type=int, default=2,
+                         help="transform threads per render in pipelined mode")
+    effects.add_argument("--buffer-pool", action="store_true",
+                         help="decode and transform every frame in preallocated, reused buffers "
+                              "(not with --pipelined)")
+    effects.add_argument("--writer", choices=["opencv", "ffmpeg"], default="opencv",
+                         help="encode with cv2.VideoWriter (mp4v) or an ffmpeg subprocess")
+    effects.add_argument("--codec", default="libx264", help="ffmpeg video encoder")
+    effects.add_argument("--preset", default="veryfast", help="ffmpeg encoder preset, e.g. ultrafast or medium")
+    effects.add_argument("--crf", type=int, default=23, help="ffmpeg constant rate factor (lower is better quality)")
+    effects.add_argument("--encoder-threads", type=int, default=0, help="ffmpeg encoder threads (0: automatic)")
+    effects.add_argument("--audio", action="store_true",
+                         help="with --writer ffmpeg, keep the input's audio, re-timed to the speed factor")
+    effects.add_argument("--no-speed", action="store_true")
+    effects.add_argument("--no-color", action="store_true")
+    effects.add_argument("--no-border", action="store_true")
+    effects.add_argument("--no-zoom", action="store_true")
+    effects.add_argument("-q", "--quiet", action="store_true", help="don't print status messages to stderr")
+
+    generate = subparsers.add_parser("generate", parents=[common, decoding, effects],
+                                     help="generate modified versions of a video")
+    generate.add_argument("input", help="input video file")
+    generate.add_argument("--single-pass", action="store_true", help="decode the input once for all versions")
+    generate.add_argument("--out", default=None, help="output directory (default: <input dir>/modified_versions)")
+    generate.add_argument("--segments", type=int, default=1,
+                          help="split each version into this many keyframe-aligned segments rendered on "
+                               "--workers processes, then join them with ffmpeg")
+    generate.add_argument("--seed", type=int, default=None,
+                          help="derive every version's parameters from this seed (default: random, reported "
+                               "in the output); versions already in --out are skipped")
+    generate.set_defaults(handler=run_generate)
+
+    batch = subparsers.add_parser("batch", parents=[common, decoding, effects],
+                                  help="generate versions for a directory or manifest of videos, resumably")
+    batch.add_argument("source", help="directory of videos, or a manifest (.json list or one path per line)")
+    batch.add_argument("--out", required=True, help="output directory")
+    batch.add_argument("--journal", default=None, help="job journal path (default: <out>/batch_journal.jsonl)")
+    batch.add_argument("--seed", type=int, default=None,
+                       help="derive every job's parameters from this seed and the input's path "
+                            "(default: the journal's seed when resuming, else random, reported in the output)")
+    batch.set_defaults(handler=run_batch)
+
+    # Sampling, threading and feature cache options shared by the comparison subcommands
+    caching = argparse.ArgumentParser(add_help=False)
+    caching.add_argument("--samples", type=int, default=20, help="frames sampled per video")
+    caching.add_argument("--sampling", choices=["uniform", "scene", "sequential"], default="uniform",
+                         help="spread samples over the clip, place them after scene changes, "
+                              "or take the first frames")
+    caching.add_argument("--workers", type=int, default=None,
+                         help="threads for feature extraction and matching (default: one per CPU)")
+    caching.add_argument("--cache-dir", default=None,
+                         help="reuse extracted features across runs from this directory")
+    caching.add_argument("--cache-size", type=int, default=2048, metavar="MB",
+                         help="evict least recently used features beyond this size")
+
+    # Progressive pass/fail comparison against a similarity threshold
+    deciding = argparse.ArgumentParser(add_help=False)
+    deciding.add_argument("--threshold", type=float, default=None,
+                          help="compare a few samples at a time and stop once overall similarity is clearly "
+                               "above or below this percentage; reports samples used and the decision")
+    deciding.add_argument("--confidence", type=float, default=0.95,
+                          help="confidence level of the intervals that settle the decision")
+    deciding.add_argument("--min-samples", type=int, default=5,
+                          help="samples compared before the first decision check")
+
+    compare = subparsers.add_parser("compare", parents=[common, decoding, caching, deciding],
+                                    help="compare a modified video against its original")
+    compare.add_argument("original")
+    compare.add_argument("modified")
+    compare.set_defaults(handler=run_compare)
+
+    compare_batch = subparsers.add_parser("compare-batch", parents=[common, decoding, caching, deciding],
+                                          help="rank many variants by similarity to one original")
+    compare_batch.add_argument("original")
+    compare_batch.add_argument("candidates", nargs="+")
+    compare_batch.add_argument("--table", action="store_true",
+                               help="print a ranked text table instead of JSON")
+    compare_batch.set_defaults(handler=run_compare_batch)
+
+    index = subparsers.add_parser("index", parents=[common],
+                                  help="add videos to a fingerprint index for near-duplicate search")
+    index.add_argument("index", help="index file (created if missing)")
+    index.add_argument("sources", nargs="+", help="videos, directories of videos, or manifests")
+    index.add_argument("--samples", type=int, default=16,
+                       help="frames hashed per video; fixed when the index is created")
+    index.add_argument("-q", "--quiet", action="store_true", help="don't print status messages to stderr")
+    index.set_defaults(handler=run_index)
+
+    search = subparsers.add_parser("search", parents=[common, decoding, caching],
+                                   help="find indexed videos that are near duplicates of a video")
+    search.add_argument("index", help="index file")
+    search.add_argument("video")
+    search.add_argument("--max-distance", type=int, default=None, metavar="BITS",
+                        help="bits by which a frame's hash may differ from the query's frame at the same "
+                             "position (default: 14)")
+    search.add_argument("--min-frames", type=int, default=None,
+                        help="frames that must match for a near duplicate (default: 3/8 of the index's samples)")
+    search.add_argument("--compare", action="store_true",
+                        help="run the full comparison on the matches and rank them")
+    search.set_defaults(handler=run_search)
+
+    server = subparsers.add_parser("serve", help="run a local HTTP server that queues generate and compare jobs")
+    server.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    server.add_argument("--port", type=int, default=8765)
+    server.add_argument("--workers", type=int, default=2, help="jobs run at the same time")
+    server.add_argument("--max-queue", type=int, default=100, help="jobs allowed to wait before submissions are refused")
+    server.add_argument("--max-finished", type=int, default=1000,
+                        help="finished jobs kept with their results; older ones are forgotten")
+    server.set_defaults(handler=run_serve)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'audio', False) and args.writer != 'ffmpeg':
+        parser.error("--audio requires --writer ffmpeg")
+    if getattr(args, 'buffer_pool', False) and args.pipelined:
+        parser.error("--buffer-pool can't be combined with --pipelined")
+    if getattr(args, 'segments', 1) > 1 and shutil.which('ffmpeg') is None:
+        parser.error("--segments needs ffmpeg on PATH to join the segments")
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
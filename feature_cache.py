@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from file_utils import default_mode, file_content_hash, write_atomic
+
+# Bump when the layout or the meaning of stored features changes
+CACHE_VERSION = 4
+
+
+class FeatureCache:
+    """On-disk store of per-video comparison features.
+
+    Entries are keyed by the video's content hash plus the analysis
+    parameters, so renamed or copied files still hit and changed
+    parameters miss. Each entry is a directory of .npy arrays that are
+    loaded memory-mapped; Canny edge maps are bit-packed, and the HSV
+    frames are recomputed from the BGR ones on load. Once the
+    cache grows past max_bytes, the least recently used entries are
+    evicted.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hash_index_path = self.cache_dir / "content_hashes.json"
+
+    def content_hash(self, video_path):
+        """Content hash of a video, memoized by path, size and modification time"""
+        path = str(Path(video_path).resolve())
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+
+        try:
+            with open(self.hash_index_path) as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            index = {}
+
+        entry = index.get(path)
+        if entry and entry[:2] == signature:
+            return entry[2]
+
+        content_hash = file_content_hash(path)
+        index[path] = signature + [content_hash]
+        write_atomic(self.hash_index_path, json.dumps(index))
+        return content_hash
+
+    def key(self, video_path, params):
+        payload = json.dumps(
+            {'content': self.content_hash(video_path), 'params': params, 'version': CACHE_VERSION},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def load(self, video_path, params):
+        """Return cached features for a video, or None on a miss"""
+        entry_dir = self.cache_dir / self.key(video_path, params)
+        meta_path = entry_dir / "meta.json"
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+        # Mark as recently used for eviction
+        os.utime(meta_path)
+
+        def array(name):
+            return np.load(entry_dir / f"{name}.npy", mmap_mode='r')
+
+        frames = array('frames')
+        hsv = np.empty(frames.shape, dtype=np.uint8)
+        if len(frames):
+            # One conversion over the whole stack, as in decode_features
+            cv2.cvtColor(np.ascontiguousarray(frames).reshape(-1, frames.shape[2], 3), cv2.COLOR_BGR2HSV,
+                         dst=hsv.reshape(-1, frames.shape[2], 3))
+        offsets = array('descriptor_offsets')
+        descriptors = array('descriptors')
+
+        return {
+            'path': str(video_path),
+            'fps': meta['fps'],
+            'positions': meta['positions'],
+            'frames': frames,
+            'hsv': hsv,
+            'edges': np.unpackbits(array('edges'), axis=-1)[..., :frames.shape[2]] * np.uint8(255),
+            'keypoint_counts': np.asarray(array('keypoint_counts')),
+            'descriptors': [
+                np.asarray(descriptors[start:end]) if end > start else None
+                for start, end in zip(offsets[:-1], offsets[1:])
+            ]
+        }
+
+    def store(self, video_path, params, features):
+        """Write features for a video, then evict old entries if over the size limit"""
+        key = self.key(video_path, params)
+        entry_dir = self.cache_dir / key
+        if entry_dir.exists():
+            return
+
+        descriptor_list = [
+            descriptors if descriptors is not None else np.empty((0, 32), dtype=np.uint8)
+            for descriptors in features['descriptors']
+        ]
+        offsets = np.zeros(len(descriptor_list) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(descriptors) for descriptors in descriptor_list])
+
+        arrays = {
+            'frames': features['frames'],
+            'edges': np.packbits(features['edges'] > 0, axis=-1),
+            'descriptors': np.concatenate(descriptor_list) if descriptor_list else np.empty((0, 32), dtype=np.uint8),
+            'descriptor_offsets': offsets,
+            'keypoint_counts': np.asarray(features['keypoint_counts'], dtype=np.int32)
+        }
+
+        # Build the entry under a temporary name so readers never see a partial one
+        temp_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=".partial-"))
+        try:
+            for name, value in arrays.items():
+                np.save(temp_dir / f"{name}.npy", value)
+            with open(temp_dir / "meta.json", 'w') as meta_file:
+                json.dump({'fps': features['fps'], 'positions': features['positions'],
+                           'source': str(video_path), 'params': params}, meta_file)
+            # mkdtemp makes the directory owner-only
+            os.chmod(temp_dir, default_mode(directory=True))
+            os.replace(temp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            if not entry_dir.exists():
+                raise
+
+        self.evict()
+
+    def entry_size(self, entry_dir):
+        return sum(path.stat().st_size for path in entry_dir.iterdir())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for entry_dir in self.cache_dir.iterdir():
+            meta_path = entry_dir / "meta.json"
+            if entry_dir.is_dir() and meta_path.exists():
+                entries.append((meta_path.stat().st_mtime, self.entry_size(entry_dir), entry_dir))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
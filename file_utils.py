@@ -0,0 +1,42 @@
+"""File helpers shared by the variant planner and the feature cache."""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+# Read once: os.umask can only be queried by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def file_content_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as video_file:
+        for chunk in iter(lambda: video_file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_mode(directory=False):
+    """Permissions a plain open() or mkdir() would give under the current umask"""
+    return (0o777 if directory else 0o666) & ~UMASK
+
+
+def write_atomic(path, text):
+    """Replace path with text, so readers see either the old or the new contents.
+
+    mkstemp creates its file owner-only; the usual mode is restored
+    before the rename.
+    """
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as temp_file:
+            temp_file.write(text)
+        os.chmod(temp_path, default_mode())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
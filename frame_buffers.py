@@ -0,0 +1,29 @@
+import numpy as np
+
+
+class FrameBuffers:
+    """Named working arrays that are allocated once and reused for every frame.
+
+    get(name, shape) returns the same array on every call as long as
+    the shape stays the same, so OpenCV calls given it as dst= write in
+    place instead of allocating a new result. A frame built in these
+    buffers is only valid until the next frame is processed; whoever
+    consumes it (the writer) must be done with it by then.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+        # Arrays created so far; stays flat once every buffer exists
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[name] = buffer
+            self.allocations += 1
+        return buffer
+
+    @property
+    def nbytes(self):
+        return sum(buffer.nbytes for buffer in self.buffers.values())
@@ -0,0 +1,116 @@
+import queue
+from threading import Thread, Event, Semaphore
+
+# Marks the end of a worker's stream on the output queue
+_DONE = object()
+
+
+class FramePipeline:
+    """Run decode -> transform -> encode as concurrent stages.
+
+    A reader thread calls read_frame() until it returns None, one or
+    more transform threads call transform(frame), and a writer thread
+    calls write(result) in the original frame order. OpenCV releases
+    the GIL inside decode, resize/color and encode calls, so the stages
+    overlap and throughput approaches that of the slowest stage.
+
+    At most max_in_flight frames exist between the reader and the
+    writer at any time; the reader blocks until the writer catches up,
+    which keeps memory bounded.
+    """
+
+    def __init__(self, read_frame, transform, write, transform_workers=2,
+                 max_in_flight=8, cancel_event=None):
+        self.read_frame = read_frame
+        self.transform = transform
+        self.write = write
+        self.transform_workers = max(1, transform_workers)
+        self.max_in_flight = max(max_in_flight, self.transform_workers + 1)
+        self.cancel_event = cancel_event if cancel_event is not None else Event()
+
+        self.slots = Semaphore(self.max_in_flight)
+        self.input_queue = queue.Queue()
+        self.output_queue = queue.Queue()
+        self.stop_event = Event()
+        self.errors = []
+        self.frames_written = 0
+
+    def fail(self, error):
+        self.errors.append(error)
+        self.stop_event.set()
+
+    def should_stop(self):
+        return self.stop_event.is_set() or self.cancel_event.is_set()
+
+    def reader(self):
+        sequence = 0
+        try:
+            while not self.should_stop():
+                # Backpressure: wait for the writer to free a slot
+                if not self.slots.acquire(timeout=0.1):
+                    continue
+                frame = self.read_frame()
+                if frame is None:
+                    self.slots.release()
+                    break
+                self.input_queue.put((sequence, frame))
+                sequence += 1
+        except Exception as e:
+            self.fail(e)
+        finally:
+            for _ in range(self.transform_workers):
+                self.input_queue.put(None)
+
+    def transformer(self):
+        while True:
+            item = self.input_queue.get()
+            if item is None:
+                self.output_queue.put(_DONE)
+                return
+
+            sequence, frame = item
+            result = None
+            if not self.should_stop():
+                try:
+                    result = self.transform(frame)
+                except Exception as e:
+                    self.fail(e)
+            # Always pass the sequence number on so the writer never waits on a gap
+            self.output_queue.put((sequence, result))
+
+    def writer(self):
+        pending = {}
+        next_sequence = 0
+        finished_workers = 0
+        while finished_workers < self.transform_workers:
+            item = self.output_queue.get()
+            if item is _DONE:
+                finished_workers += 1
+                continue
+
+            sequence, result = item
+            pending[sequence] = result
+            # Restore frame order before encoding
+            while next_sequence in pending:
+                result = pending.pop(next_sequence)
+                next_sequence += 1
+                if not self.should_stop():
+                    try:
+                        self.write(result)
+                        self.frames_written += 1
+                    except Exception as e:
+                        self.fail(e)
+                self.slots.release()
+
+    def run(self):
+        """Process the whole stream and return the number of frames written"""
+        threads = [Thread(target=self.reader, daemon=True), Thread(target=self.writer, daemon=True)]
+        threads += [Thread(target=self.transformer, daemon=True) for _ in range(self.transform_workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self.errors:
+            raise self.errors[0]
+        return self.frames_written
@@ -0,0 +1,94 @@
+import cv2
+import numpy as np
+
+from video_io import open_reader
+
+
+class FrameSampler:
+    """Random access to selected frames of a video.
+
+    Positions are fractions of the clip's length in [0, 1). A
+    speed-modified variant keeps every source frame and only changes
+    its frame rate, so the same fraction lands on the same content in
+    the original and the variant. That is equivalent to mapping
+    timestamps by the FPS ratio (t2 = t1 * fps1 / fps2), but needs no
+    knowledge of the other video.
+
+    Frames come from a video_io reader, so with the ffmpeg backend they
+    are scaled to size inside the decoder.
+    """
+
+    def __init__(self, video_path, reader='opencv', size=None, threads=0):
+        self.path = video_path
+        self.reader = open_reader(reader, video_path, size=size, threads=threads)
+        self.fps = self.reader.fps
+        self.frame_count = self.reader.frame_count
+
+    def release(self):
+        self.reader.release()
+
+    def index_at(self, position):
+        return min(int(position * self.frame_count), max(self.frame_count - 1, 0))
+
+    def seek(self, index):
+        """Move so the next read() returns frame index, decoding as little as possible"""
+        return self.reader.seek(index)
+
+    def read(self):
+        return self.reader.read()
+
+    def read_positions(self, positions):
+        """Yield (index, frame) for each position, in increasing order"""
+        for index in sorted({self.index_at(position) for position in positions}):
+            if not self.seek(index):
+                return
+            frame = self.read()
+            if frame is None:
+                return
+            yield index, frame
+
+    @staticmethod
+    def uniform_positions(count):
+        """Centres of count equal slices of the timeline"""
+        return [(index + 0.5) / count for index in range(count)]
+
+    def scene_positions(self, count, probes_per_sample=8, thumbnail_size=(64, 36)):
+        """Positions just after the count largest scene changes.
+
+        Probes count * probes_per_sample evenly spaced frames at
+        thumbnail resolution and scores each by its mean absolute
+        difference from the previous probe. Falls back to uniform
+        positions where the clip has fewer distinct changes.
+        """
+        probe_count = min(count * probes_per_sample, max(self.frame_count, 1))
+        probes = self.uniform_positions(probe_count)
+
+        scores = []
+        previous = None
+        for index, frame in self.read_positions(probes):
+            thumbnail = cv2.cvtColor(cv2.resize(frame, thumbnail_size, interpolation=cv2.INTER_AREA),
+                                     cv2.COLOR_BGR2GRAY)
+            if previous is not None:
+                scores.append((float(np.mean(cv2.absdiff(thumbnail, previous))), index))
+            previous = thumbnail
+
+        # Largest changes first, at most one per uniform slice so samples stay spread out
+        positions = []
+        used_slices = set()
+        for score, index in sorted(scores, reverse=True):
+            position = index / self.frame_count
+            slice_index = int(position * count)
+            if score <= 0 or slice_index in used_slices:
+                continue
+            used_slices.add(slice_index)
+            positions.append(position)
+            if len(positions) == count:
+                break
+
+        for slice_index, position in enumerate(self.uniform_positions(count)):
+            if len(positions) == count:
+                break
+            if slice_index not in used_slices:
+                positions.append(position)
+
+        return sorted(positions)
@@ -0,0 +1,489 @@
+"""Local HTTP job server for generation and comparison requests.
+
+    python -m cli serve --port 8765 --workers 2
+
+Endpoints (JSON in and out, one request per connection):
+
+    POST   /jobs              submit a job, returns it with its id (202)
+    GET    /jobs              every job, without results
+    GET    /jobs/<id>         one job, with its result once finished
+    GET    /jobs/<id>/events  server-sent events: progress, status, state
+    DELETE /jobs/<id>         cancel a queued or running job
+    GET    /metrics           queue depth, running jobs and throughput
+
+A job is {"type": "generate", "input": ..., "num_versions": 5, ...} or
+{"type": "compare", "original": ..., "modified": ...} (plus "threshold"
+for a progressive pass/fail comparison), optionally with "priority"
+(higher runs first, ties in submission order) and "options" (keyword
+arguments for VideoModifier or VideoAnalyzer). Jobs run on a
+fixed number of worker threads; OpenCV releases the GIL, and generate
+jobs can use worker processes of their own through "workers". Only the
+most recent finished jobs are kept, with their results; throughput
+metrics still count every job.
+
+Only the option keys in JOB_OPTIONS are accepted, so a request can't
+choose which executable runs. Request bodies must be sent as
+application/json, and requests whose Host or Origin is not this
+machine are refused, so web pages can't submit jobs from a browser.
+"""
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from urllib.parse import urlsplit
+
+from json_values import to_json_value
+from metrics import ProgressChannel
+
+TERMINAL_STATES = ('done', 'failed', 'cancelled')
+MAX_BODY_BYTES = 1 << 20
+REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+           405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large', 415: 'Unsupported Media Type',
+           503: 'Service Unavailable'}
+
+# Host names a request may address the server by, besides the address it listens on
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def run_generate_job(spec, channel, cancel_event):
+    from video_modifier import VideoModifier
+
+    modifier = VideoModifier(
+        spec['input'],
+        progress_callback=channel.progress,
+        status_callback=channel.status,
+        cancel_event=cancel_event,
+        **spec.get('options', {})
+    )
+    versions = modifier.generate_multiple_versions(
+        spec.get('num_versions', 5),
+        single_pass=spec.get('single_pass', False),
+        workers=spec.get('workers', 1),
+        output_dir=spec.get('output_dir'),
+        segments=spec.get('segments', 1),
+        seed=spec.get('seed')
+    )
+    return {
+        'input': spec['input'],
+        'seed': modifier.plan.seed,
+        'manifest': str(modifier.plan.manifest_path),
+        'versions': versions,
+        'frames': sum(version['metrics']['frames'] for version in versions if version['metrics'])
+    }
+
+
+def run_compare_job(spec, channel, cancel_event):
+    from video_analyzer import VideoAnalyzer
+
+    channel.status("Analyzing...")
+    analyzer = VideoAnalyzer(spec['original'], spec['modified'], **spec.get('options', {}))
+    if spec.get('threshold') is not None:
+        results = analyzer.analyze_progressive(spec['threshold'], spec.get('confidence', 0.95),
+                                               spec.get('min_samples', 5))
+    else:
+        results = analyzer.analyze_videos()
+    return {
+        'original': spec['original'],
+        'modified': spec['modified'],
+        'results': results,
+        'metrics': analyzer.metrics,
+        'frames': analyzer.metrics.get('frames', 0)
+    }
+
+
+# Job type -> (runner, required fields)
+JOB_TYPES = {
+    'generate': (run_generate_job, ('input',)),
+    'compare': (run_compare_job, ('original', 'modified'))
+}
+
+# Keyword arguments a job's "options" may set, per job type
+JOB_OPTIONS = {
+    'generate': {'use_speed', 'use_color', 'use_border', 'use_zoom', 'zoom_min', 'zoom_max',
+                 'speed_min', 'speed_max', 'pipelined', 'transform_workers', 'writer', 'writer_options',
+                 'reader', 'reader_threads', 'buffer_pool', 'speed_mode', 'output_fps'},
+    'compare': {'frame_samples', 'sampling', 'workers', 'reader', 'reader_threads'}
+}
+# Encoder settings a generate job's writer_options may set; never the ffmpeg executable
+WRITER_OPTIONS = {'codec', 'preset', 'crf', 'threads', 'audio'}
+
+
+class JobChannel(ProgressChannel):
+    """ProgressChannel whose events are published on the job from the event loop"""
+
+    def __init__(self, loop, job, min_interval=0.25):
+        super().__init__(min_interval)
+        self.loop = loop
+        self.job = job
+
+    def post(self, kind, value=None):
+        self.loop.call_soon_threadsafe(self.job.publish, kind, value)
+
+
+class Job:
+    """One submitted request, its state and the event streams watching it"""
+
+    def __init__(self, job_id, spec):
+        self.id = job_id
+        self.spec = spec
+        self.type = spec['type']
+        self.priority = spec.get('priority', 0)
+        self.state = 'queued'
+        self.progress = 0.0
+        self.status = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = Event()
+        self.subscribers = set()
+
+    @property
+    def finished_state(self):
+        return self.state in TERMINAL_STATES
+
+    def to_dict(self, include_result=False):
+        job = {
+            'id': self.id,
+            'type': self.type,
+            'priority': self.priority,
+            'state': self.state,
+            'progress': self.progress,
+            'status': self.status,
+            'error': self.error,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished
+        }
+        if include_result:
+            job['spec'] = self.spec
+            job['result'] = self.result
+        return job
+
+    def publish(self, kind, value=None):
+        """Record an event and hand it to every subscriber; runs on the event loop"""
+        if kind == 'progress':
+            self.progress = value
+        elif kind == 'status':
+            self.status = value
+        for subscriber in self.subscribers:
+            subscriber.put_nowait((kind, value))
+
+    def set_state(self, state):
+        self.state = state
+        self.publish('state', self.to_dict(include_result=self.finished_state))
+
+
+class JobServer:
+    """Priority job queue drained by a bounded pool of worker threads, served over HTTP.
+
+    At most max_queue jobs may wait; further submissions are refused
+    with 503 until the queue drains. Once more than max_finished jobs
+    have finished, the oldest finished ones are forgotten (404).
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, workers=2, max_queue=100, max_finished=1000):
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self.jobs = {}
+        # Finished job ids, oldest first
+        self.finished_ids = deque()
+        # Totals of every completed job by type, including forgotten ones
+        self.completed = {job_type: {'completed': 0, 'wait_s': 0.0, 'run_s': 0.0, 'frames': 0}
+                          for job_type in JOB_TYPES}
+        self.ids = itertools.count(1)
+        self.order = itertools.count()
+        self.running = 0
+        self.started = time.time()
+        self.server = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.PriorityQueue()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+        self.worker_tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        # With port 0 the system picks a free port
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop accepting connections, cancel all jobs and wait for running renders to stop"""
+        self.server.close()
+        await self.server.wait_closed()
+        for job in self.jobs.values():
+            if not job.finished_state:
+                job.cancel_event.set()
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        await self.loop.run_in_executor(None, self.executor.shutdown)
+
+    def queue_depth(self):
+        return sum(1 for job in self.jobs.values() if job.state == 'queued')
+
+    def submit(self, spec):
+        """Validate a job spec and queue it"""
+        if not isinstance(spec, dict):
+            raise HTTPError(400, "job must be a JSON object")
+        job_type = spec.get('type')
+        if job_type not in JOB_TYPES:
+            raise HTTPError(400, f"job type must be one of {sorted(JOB_TYPES)}")
+        missing = [field for field in JOB_TYPES[job_type][1] if field not in spec]
+        if missing:
+            raise HTTPError(400, f"missing fields for {job_type}: {', '.join(missing)}")
+        options = spec.get('options', {})
+        if not isinstance(options, dict):
+            raise HTTPError(400, "options must be a JSON object")
+        unknown = sorted(set(options) - JOB_OPTIONS[job_type])
+        if unknown:
+            raise HTTPError(400, f"options not allowed for {job_type}: {', '.join(unknown)}")
+        writer_options = options.get('writer_options', {})
+        if not isinstance(writer_options, dict):
+            raise HTTPError(400, "writer_options must be a JSON object")
+        unknown = sorted(set(writer_options) - WRITER_OPTIONS)
+        if unknown:
+            raise HTTPError(400, f"writer_options not allowed: {', '.join(unknown)}")
+        if not isinstance(spec.get('priority', 0), int):
+            raise HTTPError(400, "priority must be an integer")
+        if self.queue_depth() >= self.max_queue:
+            raise HTTPError(503, f"queue is full ({self.max_queue} jobs waiting)")
+
+        job = Job(str(next(self.ids)), spec)
+        self.jobs[job.id] = job
+        self.queue.put_nowait((-job.priority, next(self.order), job.id))
+        return job
+
+    def cancel(self, job):
+        """Drop a queued job, or ask a running generation to stop after its current frame.
+
+        A running comparison can't be interrupted and finishes normally.
+        """
+        if job.finished_state:
+            raise HTTPError(409, f"job {job.id} is already {job.state}")
+        job.cancel_event.set()
+        if job.state == 'queued':
+            job.finished = time.time()
+            job.set_state('cancelled')
+            self.retire(job)
+
+    def retire(self, job):
+        """Count a finished job and forget the oldest finished jobs beyond max_finished"""
+        if job.state == 'done':
+            totals = self.completed[job.type]
+            totals['completed'] += 1
+            totals['wait_s'] += job.started - job.submitted
+            totals['run_s'] += job.finished - job.started
+            totals['frames'] += job.result.get('frames', 0)
+
+        self.finished_ids.append(job.id)
+        while len(self.finished_ids) > self.max_finished:
+            self.jobs.pop(self.finished_ids.popleft(), None)
+
+    async def worker(self):
+        while True:
+            _, _, job_id = await self.queue.get()
+            job = self.jobs.get(job_id)
+            # Cancelled while queued, and possibly forgotten since
+            if job is None or job.state != 'queued':
+                continue
+
+            runner = JOB_TYPES[job.type][0]
+            channel = JobChannel(self.loop, job)
+            job.started = time.time()
+            job.set_state('running')
+            self.running += 1
+            try:
+                job.result = to_json_value(
+                    await self.loop.run_in_executor(self.executor, runner, job.spec, channel, job.cancel_event))
+                state = 'cancelled' if job.cancel_event.is_set() and job.type == 'generate' else 'done'
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                state = 'failed'
+            finally:
+                self.running -= 1
+            job.finished = time.time()
+            job.set_state(state)
+            self.retire(job)
+
+    def metrics(self):
+        """Queue depth, job counts by state and throughput since the server started"""
+        now = time.time()
+        uptime = now - self.started
+        states = {}
+        for job in self.jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+
+        by_type = {}
+        for job_type, totals in self.completed.items():
+            completed = totals['completed']
+            by_type[job_type] = {
+                'completed': completed,
+                'mean_wait_s': totals['wait_s'] / completed if completed else 0.0,
+                'mean_run_s': totals['run_s'] / completed if completed else 0.0,
+                'frames': totals['frames'],
+                'fps': totals['frames'] / totals['run_s'] if totals['run_s'] > 0 else 0.0
+            }
+        completed = sum(totals['completed'] for totals in self.completed.values())
+
+        return {
+            'uptime_s': uptime,
+            'workers': self.workers,
+            'queue_depth': self.queue_depth(),
+            'max_queue': self.max_queue,
+            'running': self.running,
+            'jobs': states,
+            'completed_last_minute': sum(1 for job in self.jobs.values()
+                                         if job.state == 'done' and now - job.finished <= 60),
+            'jobs_per_minute': completed / uptime * 60 if uptime > 0 else 0.0,
+            'by_type': by_type
+        }
+
+    async def read_request(self, reader):
+        """Parse one HTTP/1.1 request into (method, path, JSON body or None)"""
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise HTTPError(400, "malformed request line")
+        method, target, _ = request_line
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        self.check_origin(headers)
+
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            raise HTTPError(400, "malformed Content-Length header")
+        if length < 0:
+            raise HTTPError(400, "malformed Content-Length header")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        body = None
+        if length:
+            content_type = headers.get('content-type', '').split(';', 1)[0].strip().lower()
+            if content_type != 'application/json':
+                raise HTTPError(415, "request body must be sent as application/json")
+            try:
+                body = json.loads(await reader.readexactly(length))
+            except ValueError:
+                raise HTTPError(400, "request body is not valid JSON")
+        return method.upper(), target.split('?', 1)[0].rstrip('/') or '/', body
+
+    def check_origin(self, headers):
+        """Refuse requests addressed to another host name or sent from a web page elsewhere.
+
+        A Host check stops DNS rebinding; an Origin check stops pages on
+        other sites from posting to the server from a browser.
+        """
+        allowed = LOCAL_HOSTS | {self.host}
+        host = headers.get('host')
+        if host is not None and urlsplit(f"//{host}").hostname not in allowed:
+            raise HTTPError(403, f"requests for host {host} are not served")
+        origin = headers.get('origin')
+        if origin is not None and urlsplit(origin).hostname not in allowed:
+            raise HTTPError(403, f"requests from origin {origin} are not served")
+
+    async def send_json(self, writer, status, payload):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    def find_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPError(404, f"no job {job_id}")
+        return job
+
+    async def handle_connection(self, reader, writer):
+        try:
+            try:
+                method, path, body = await self.read_request(reader)
+                await self.route(method, path, body, writer)
+            except HTTPError as e:
+                await self.send_json(writer, e.status, {'error': str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body, writer):
+        parts = path.strip('/').split('/')
+        if parts == ['metrics'] and method == 'GET':
+            await self.send_json(writer, 200, self.metrics())
+        elif parts == ['jobs'] and method == 'GET':
+            await self.send_json(writer, 200, {'jobs': [job.to_dict() for job in self.jobs.values()]})
+        elif parts == ['jobs'] and method == 'POST':
+            job = self.submit(body)
+            await self.send_json(writer, 202, job.to_dict())
+        elif len(parts) == 2 and parts[0] == 'jobs' and method == 'GET':
+            await self.send_json(writer, 200, self.find_job(parts[1]).to_dict(include_result=True))
+        elif len(parts) == 2 and parts[0] == 'jobs' and method == 'DELETE':
+            job = self.find_job(parts[1])
+            self.cancel(job)
+            await self.send_json(writer, 200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events' and method == 'GET':
+            await self.stream_events(self.find_job(parts[1]), writer)
+        elif parts[0] in ('jobs', 'metrics'):
+            raise HTTPError(405, f"{method} not allowed on {path}")
+        else:
+            raise HTTPError(404, f"no route for {path}")
+
+    async def stream_events(self, job, writer):
+        """Send the job's current state, then every event until it finishes"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        events = asyncio.Queue()
+        job.subscribers.add(events)
+        try:
+            kind, value = 'state', job.to_dict(include_result=job.finished_state)
+            while True:
+                writer.write(f"event: {kind}\ndata: {json.dumps(value)}\n\n".encode())
+                await writer.drain()
+                if kind == 'state' and value['state'] in TERMINAL_STATES:
+                    break
+                kind, value = await events.get()
+        finally:
+            job.subscribers.discard(events)
+
+
+def serve(host='127.0.0.1', port=8765, workers=2, max_queue=100, max_finished=1000, status=print):
+    """Run a JobServer until interrupted"""
+    async def run():
+        server = JobServer(host, port, workers, max_queue, max_finished)
+        await server.start()
+        status(f"Serving jobs on http://{server.host}:{server.port} with {server.workers} workers")
+        try:
+            await server.server.serve_forever()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,12 @@
+"""Conversion of analysis results into values the json module can serialize."""
+
+
+def to_json_value(value):
+    """Convert NumPy scalars and tuples into plain JSON values"""
+    if isinstance(value, dict):
+        return {key: to_json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_value(item) for item in value]
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
@@ -0,0 +1,147 @@
+import queue
+import time
+from contextlib import contextmanager, nullcontext
+from threading import Lock
+
+
+class StageTimer:
+    """Accumulates wall time and call counts per named processing stage.
+
+    Safe to share between threads, e.g. the transform workers of a
+    FramePipeline; stage totals are then summed across threads.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+        self.lock = Lock()
+        self.started = time.perf_counter()
+        self.frames = 0
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def count_frame(self):
+        with self.lock:
+            self.frames += 1
+
+    def summary(self):
+        """Per-stage totals plus overall frames/sec as a JSON-ready dict"""
+        wall = time.perf_counter() - self.started
+        with self.lock:
+            stages = {
+                name: {
+                    'total_s': total,
+                    'calls': self.counts[name],
+                    'ms_per_call': total / self.counts[name] * 1000
+                }
+                for name, total in self.totals.items()
+            }
+            frames = self.frames
+        return {
+            'frames': frames,
+            'wall_s': wall,
+            'fps': frames / wall if wall > 0 else 0.0,
+            'stages': stages
+        }
+
+
+def combine_summaries(summaries, wall_s):
+    """Merge StageTimer summaries of work that ran concurrently over wall_s seconds.
+
+    Frames and stage totals are summed; frames/sec is measured against
+    the shared wall time rather than the sum of each part's.
+    """
+    frames = sum(summary['frames'] for summary in summaries)
+    totals = {}
+    counts = {}
+    for summary in summaries:
+        for name, stage in summary['stages'].items():
+            totals[name] = totals.get(name, 0.0) + stage['total_s']
+            counts[name] = counts.get(name, 0) + stage['calls']
+    return {
+        'frames': frames,
+        'wall_s': wall_s,
+        'fps': frames / wall_s if wall_s > 0 else 0.0,
+        'stages': {
+            name: {
+                'total_s': total,
+                'calls': counts[name],
+                'ms_per_call': total / counts[name] * 1000 if counts[name] else 0.0
+            }
+            for name, total in totals.items()
+        }
+    }
+
+
+class NullTimer:
+    """Stand-in for StageTimer when no metrics are being collected"""
+
+    def stage(self, name):
+        return nullcontext()
+
+    def add(self, name, seconds):
+        pass
+
+    def count_frame(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class ProgressChannel:
+    """Thread-safe, rate-limited progress and status events.
+
+    Worker threads call progress(), status() or post(); the consumer
+    drains the queue from its own thread, e.g. a Tk after() loop via
+    poll(). Progress updates closer together than min_interval seconds
+    are dropped, except the final 100%.
+    """
+
+    def __init__(self, min_interval=0.1):
+        self.min_interval = min_interval
+        self.events = queue.Queue()
+        self.last_progress = 0.0
+
+    def progress(self, value):
+        now = time.monotonic()
+        if value < 100 and now - self.last_progress < self.min_interval:
+            return
+        self.last_progress = now
+        self.post('progress', value)
+
+    def status(self, message):
+        self.post('status', message)
+
+    def post(self, kind, value=None):
+        self.events.put((kind, value))
+
+    def drain(self):
+        """Return all pending events without blocking"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def poll(self, root, handlers, interval_ms=100):
+        """Deliver events to handlers[kind](value) on the Tk thread every interval_ms"""
+        def deliver():
+            for kind, value in self.drain():
+                if kind in handlers:
+                    handlers[kind](value)
+            root.after(interval_ms, deliver)
+
+        root.after(interval_ms, deliver)
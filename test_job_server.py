@@ -0,0 +1,88 @@
+"""Loopback checks that the job server refuses requests it must not run.
+
+    python -m unittest test_job_server
+"""
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from job_server import JobServer
+
+
+class JobServerRejectionTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = JobServer(port=0, workers=1)
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send one raw request and return (status, JSON payload)"""
+        headers = dict({'Host': f"127.0.0.1:{self.server.port}"}, **(headers or {}))
+        data = json.dumps(body).encode() if body is not None else b""
+        if body is not None:
+            headers['Content-Length'] = str(len(data))
+        head = f"{method} {path} HTTP/1.1\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.server.port)
+        writer.write(head.encode() + b"\r\n" + data)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+
+        status_line, _, rest = response.decode().partition("\r\n")
+        return int(status_line.split()[1]), json.loads(rest.partition("\r\n\r\n")[2])
+
+    def compare_job(self, **fields):
+        return dict({'type': 'compare', 'original': 'missing1.mp4', 'modified': 'missing2.mp4'}, **fields)
+
+    async def test_rejects_non_json_content_type(self):
+        status, _ = await self.request('POST', '/jobs', self.compare_job(), {'Content-Type': 'text/plain'})
+        self.assertEqual(status, 415)
+        self.assertEqual(self.server.jobs, {})
+
+    async def test_rejects_missing_content_type(self):
+        status, _ = await self.request('POST', '/jobs', self.compare_job())
+        self.assertEqual(status, 415)
+
+    async def test_rejects_executable_in_writer_options(self):
+        with tempfile.TemporaryDirectory() as directory:
+            marker = os.path.join(directory, 'ran')
+            spec = {
+                'type': 'generate',
+                'input': marker,
+                'options': {'writer': 'ffmpeg', 'writer_options': {'ffmpeg': '/usr/bin/touch'}}
+            }
+            status, payload = await self.request('POST', '/jobs', spec, {'Content-Type': 'application/json'})
+            self.assertEqual(status, 400)
+            self.assertIn('ffmpeg', payload['error'])
+            self.assertFalse(os.path.exists(marker))
+        self.assertEqual(self.server.jobs, {})
+
+    async def test_rejects_unknown_options(self):
+        spec = self.compare_job(options={'cache': '/tmp'})
+        status, _ = await self.request('POST', '/jobs', spec, {'Content-Type': 'application/json'})
+        self.assertEqual(status, 400)
+
+    async def test_rejects_foreign_origin(self):
+        headers = {'Content-Type': 'application/json', 'Origin': 'https://example.com'}
+        status, _ = await self.request('POST', '/jobs', self.compare_job(), headers)
+        self.assertEqual(status, 403)
+        self.assertEqual(self.server.jobs, {})
+
+    async def test_rejects_foreign_host(self):
+        status, _ = await self.request('GET', '/metrics', headers={'Host': 'attacker.example:8765'})
+        self.assertEqual(status, 403)
+
+    async def test_accepts_local_json_request(self):
+        headers = {'Content-Type': 'application/json; charset=utf-8', 'Origin': f"http://localhost:{self.server.port}"}
+        status, payload = await self.request('POST', '/jobs', self.compare_job(), headers)
+        self.assertEqual(status, 202)
+        self.assertIn(payload['id'], self.server.jobs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Reproducible, deduplicated variant plans.
+
+A plan turns a seed into a list of variant parameters, names each
+output after a hash of the source video, its parameters and the output
+settings, and keeps a manifest.json of every output's parameters in the
+output directory.
+"""
+import hashlib
+import json
+import os
+import random
+from pathlib import Path
+
+from file_utils import file_content_hash, write_atomic
+
+# Parameters are rounded so that plans differing only in invisible noise count as equal
+PARAM_DECIMALS = 4
+
+MANIFEST_NAME = "manifest.json"
+
+
+def variant_rng(seed, index, attempt=0, source=None):
+    """Independent random stream for one variant slot of a seeded plan.
+
+    source separates the streams of different inputs sharing one seed.
+    """
+    if source is not None:
+        return random.Random(f"{seed}:{source}:{index}:{attempt}")
+    return random.Random(f"{seed}:{index}:{attempt}")
+
+
+def round_params(params):
+    return {
+        key: round(value, PARAM_DECIMALS) if isinstance(value, float) else value
+        for key, value in params.items()
+    }
+
+
+def variant_key(source_hash, params, settings):
+    """Short hash identifying the output of params applied to a source with the given output settings"""
+    payload = json.dumps({'source': source_hash, 'params': params, 'settings': settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class VariantPlan:
+    """Seeded set of distinct variants for one source video.
+
+    Variant i draws its parameters from a random stream derived from
+    (seed, i), so a plan is reproducible from its seed alone. Outputs
+    are named by a hash of the source contents, the parameters and the
+    modifier's output settings (writer, encoder options, ...), so an
+    output that exists is already the right render and is skipped.
+    Variants whose parameters repeat one already in the plan are
+    redrawn, and rejected if they still repeat.
+    """
+
+    def __init__(self, modifier, output_dir, seed=None, max_attempts=10):
+        self.modifier = modifier
+        self.output_dir = Path(output_dir)
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 32)
+        self.max_attempts = max_attempts
+        self.source_hash = file_content_hash(modifier.input_path)
+        self.settings = modifier.output_settings()
+        self.variants = []
+        self.rejected = 0
+
+    @property
+    def manifest_path(self):
+        return self.output_dir / MANIFEST_NAME
+
+    def output_path(self, key):
+        input_path = Path(self.modifier.input_path)
+        return str(self.output_dir / f"{input_path.stem}_{key}{input_path.suffix}")
+
+    def build(self, num_versions):
+        """Draw num_versions variants, dropping any that duplicate an earlier one"""
+        seen = set()
+        for index in range(num_versions):
+            for attempt in range(self.max_attempts):
+                params = round_params(self.modifier.generate_variant_params(variant_rng(self.seed, index, attempt)))
+                key = variant_key(self.source_hash, params, self.settings)
+                if key not in seen:
+                    break
+            else:
+                self.rejected += 1
+                continue
+
+            seen.add(key)
+            self.variants.append({
+                'index': index,
+                'key': key,
+                'output_path': self.output_path(key),
+                'params': params
+            })
+        return self
+
+    def pending(self):
+        """Variants whose output has not been rendered yet"""
+        return [variant for variant in self.variants if not os.path.exists(variant['output_path'])]
+
+    def write_manifest(self):
+        """Record every planned output's parameters, merged with earlier runs into the same directory"""
+        try:
+            with open(self.manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            manifest = {'outputs': {}}
+
+        for variant in self.variants:
+            manifest['outputs'][Path(variant['output_path']).name] = {
+                'source': str(Path(self.modifier.input_path).resolve()),
+                'source_hash': self.source_hash,
+                'seed': self.seed,
+                'index': variant['index'],
+                'key': variant['key'],
+                'params': variant['params'],
+                'settings': self.settings
+            }
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.manifest_path, json.dumps(manifest, indent=2, sort_keys=True))
@@ -0,0 +1,652 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from frame_sampler import FrameSampler
+from metrics import StageTimer, NULL_TIMER
+
+# Width in pixels of the frame edges inspected for borders
+BORDER_WIDTH = 30
+
+# Weights of each metric in the overall difference
+METRIC_WEIGHTS = {
+    'speed_diff': 0.1,
+    'zoom_diff': 0.1,
+    'hue_diff': 0.15,
+    'saturation_diff': 0.15,
+    'brightness_diff': 0.15,
+    'border_diff': 0.15,
+    'edge_diff': 0.1,
+    'overlay_diff': 0.1
+}
+
+# How sample frames are chosen: spread evenly over the clip, just after
+# scene changes, or the first frames in order (the original behaviour)
+SAMPLING_MODES = ('uniform', 'scene', 'sequential')
+
+
+def t_critical(confidence, dof):
+    """Two-sided Student t critical value for a whole number of degrees of freedom.
+
+    Solved by bisection on the closed form of P(|T| < t), which for
+    whole degrees of freedom is a finite series in the angle
+    atan(t / sqrt(dof)) (Abramowitz and Stegun 26.7.3 and 26.7.4).
+    """
+    def coverage(t):
+        theta = math.atan(t / math.sqrt(dof))
+        cos2 = math.cos(theta) ** 2
+        if dof == 1:
+            return 2 / math.pi * theta
+        if dof % 2:
+            term = series = math.cos(theta)
+            for j in range(1, (dof - 1) // 2):
+                term *= cos2 * 2 * j / (2 * j + 1)
+                series += term
+            return 2 / math.pi * (theta + math.sin(theta) * series)
+        term = series = 1.0
+        for j in range(1, dof // 2):
+            term *= cos2 * (2 * j - 1) / (2 * j)
+            series += term
+        return math.sin(theta) * series
+
+    low, high = 0.0, 1.0
+    while coverage(high) < confidence:
+        high *= 2
+    for _ in range(100):
+        middle = (low + high) / 2
+        low, high = (middle, high) if coverage(middle) < confidence else (low, middle)
+    return (low + high) / 2
+
+
+def spread_order(count):
+    """Indices 0..count-1 ordered so that every prefix is spread evenly over the range.
+
+    Starts in the middle, then repeatedly takes the index farthest from
+    all those taken so far (the lowest one on ties).
+    """
+    if count <= 0:
+        return []
+    order = [count // 2]
+    distances = [abs(index - order[0]) for index in range(count)]
+    while len(order) < count:
+        farthest = max(range(count), key=lambda index: (distances[index], -index))
+        order.append(farthest)
+        distances = [min(distance, abs(index - farthest)) for index, distance in enumerate(distances)]
+    return order
+
+
+def select_samples(features, indices):
+    """Features restricted to the samples at indices, as extract_features would return them"""
+    return dict(
+        features,
+        positions=[features['positions'][index] for index in indices],
+        frames=features['frames'][indices],
+        hsv=features['hsv'][indices],
+        edges=features['edges'][indices],
+        keypoint_counts=features['keypoint_counts'][indices],
+        descriptors=[features['descriptors'][index] for index in indices]
+    )
+
+
+def merge_samples(parts):
+    """Features of several extractions from one video, concatenated in order"""
+    return dict(
+        parts[0],
+        positions=[position for part in parts for position in part['positions']],
+        frames=np.concatenate([part['frames'] for part in parts]),
+        hsv=np.concatenate([part['hsv'] for part in parts]),
+        edges=np.concatenate([part['edges'] for part in parts]),
+        keypoint_counts=np.concatenate([part['keypoint_counts'] for part in parts]),
+        descriptors=[descriptors for part in parts for descriptors in part['descriptors']]
+    )
+
+
+class SampleSource:
+    """Features of one video at chosen indices into a fixed list of positions, decoded on request.
+
+    The video stays open until close(), so a progressive comparison
+    decodes each sample once without reopening the file every round.
+    With a cache, the features a full extraction stored under
+    key_positions (see VideoAnalyzer.feature_params) are used instead
+    of decoding, and once every position has been decoded, close()
+    stores them there for full comparisons to reuse. Partial sets are
+    not cached.
+    """
+
+    def __init__(self, analyzer, video_path, positions, key_positions=None, timer=NULL_TIMER, sampler=None):
+        self.analyzer = analyzer
+        self.video_path = video_path
+        self.positions = positions
+        self.params = analyzer.feature_params(key_positions)
+        self.timer = timer
+        self.sampler = sampler
+        # (indices, features) of every request decoded so far
+        self.parts = []
+        self.cached = None
+        if analyzer.cache is not None:
+            with timer.stage('cache_load'):
+                cached = analyzer.cache.load(video_path, self.params)
+            if cached is not None and len(cached['positions']) == len(positions):
+                self.cached = cached
+
+    def features(self, indices):
+        if self.cached is not None:
+            return select_samples(self.cached, indices)
+        if self.sampler is None:
+            self.sampler = self.analyzer.open_sampler(self.video_path)
+        features = self.analyzer.decode_features(self.sampler, [self.positions[index] for index in indices],
+                                                 self.timer)
+        self.parts.append((indices, features))
+        return features
+
+    def close(self):
+        if self.sampler is not None:
+            self.sampler.release()
+            self.sampler = None
+        if self.analyzer.cache is None or self.cached is not None:
+            return
+
+        decoded = [index for indices, _ in self.parts for index in indices]
+        complete = sorted(decoded) == list(range(len(self.positions))) and all(
+            len(features['positions']) == len(indices) for indices, features in self.parts)
+        if complete:
+            features = merge_samples([features for _, features in self.parts])
+            with self.timer.stage('cache_store'):
+                self.analyzer.cache.store(self.video_path, self.params,
+                                          select_samples(features, sorted(range(len(decoded)), key=decoded.__getitem__)))
+
+
+class VideoAnalyzer:
+    """Headless comparison of an original video against modified ones"""
+
+    def __init__(self, video1_path=None, video2_path=None, frame_samples=20, cache=None, sampling='uniform',
+                 workers=None, reader='opencv', reader_threads=0):
+        if sampling not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode: {sampling}")
+        self.video1_path = video1_path
+        self.video2_path = video2_path
+        self.frame_samples = frame_samples
+        self.sampling = sampling
+        # Threads for per-sample ORB, Canny and matching; OpenCV releases the GIL in those calls
+        self.workers = workers or os.cpu_count() or 1
+        # Decoder backend (see video_io.open_reader); ffmpeg scales to 640x480 while decoding
+        self.reader = reader
+        self.reader_threads = reader_threads
+        # Optional feature_cache.FeatureCache shared across runs
+        self.cache = cache
+        # Stage timings of the last analysis run
+        self.metrics = None
+
+    def calculate_speed_difference(self, fps1, fps2):
+        return abs(fps1 - fps2) / max(fps1, fps2) * 100
+
+    def calculate_hsv_differences(self, frame1, frame2):
+        hsv1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2HSV)
+        hsv2 = cv2.cvtColor(frame2, cv2.COLOR_BGR2HSV)
+        return self.hsv_channel_differences(hsv1, hsv2)
+
+    def hsv_channel_differences(self, hsv1, hsv2):
+        # Calculate differences for each channel
+        hue_diff = np.mean(np.abs(hsv1[:, :, 0] - hsv2[:, :, 0])) / 180 * 100
+        sat_diff = np.mean(np.abs(hsv1[:, :, 1] - hsv2[:, :, 1])) / 255 * 100
+        val_diff = np.mean(np.abs(hsv1[:, :, 2] - hsv2[:, :, 2])) / 255 * 100
+
+        return hue_diff, sat_diff, val_diff
+
+    def detect_features(self, frame):
+        """ORB keypoint count and descriptors of a frame"""
+        orb = cv2.ORB_create()
+        keypoints, descriptors = orb.detectAndCompute(frame, None)
+        return len(keypoints), descriptors
+
+    def calculate_zoom_difference(self, frame1, frame2):
+        # Calculate features and match them
+        count1, des1 = self.detect_features(frame1)
+        count2, des2 = self.detect_features(frame2)
+        return self.descriptor_difference(count1, des1, count2, des2)
+
+    def descriptor_difference(self, count1, des1, count2, des2):
+        if des1 is None or des2 is None or count1 < 2 or count2 < 2:
+            return 0
+
+        # Match features
+        bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+        matches = bf.match(des1, des2)
+
+        # Calculate average distance between matched points
+        if len(matches) > 0:
+            avg_dist = np.mean([m.distance for m in matches])
+            # Normalize to percentage
+            zoom_diff = min((avg_dist / 100) * 100, 100)
+        else:
+            zoom_diff = 0
+
+        return zoom_diff
+
+    def calculate_border_difference(self, frame1, frame2):
+        return float(self.border_differences(frame1[None], frame2[None])[0])
+
+    def border_differences(self, frames1, frames2):
+        """Border metric for every pair in two (N, H, W, 3) stacks of frames.
+
+        Only the 30-pixel strips along each edge are read, as views;
+        means are taken over the full frame area, as if everything
+        outside the strips were masked to zero.
+        """
+        count, height, width = frames1.shape[:3]
+        area = height * width * 3
+
+        # Define border regions (30 pixels from each edge), without overlapping corners
+        def strips(frames):
+            return (
+                frames[:, :BORDER_WIDTH],  # top
+                frames[:, -BORDER_WIDTH:],  # bottom
+                frames[:, BORDER_WIDTH:-BORDER_WIDTH, :BORDER_WIDTH],  # left
+                frames[:, BORDER_WIDTH:-BORDER_WIDTH, -BORDER_WIDTH:]  # right
+            )
+
+        diff_sum = np.zeros(count)
+        sum1 = np.zeros(count)
+        sum2 = np.zeros(count)
+        for strip1, strip2 in zip(strips(frames1), strips(frames2)):
+            strip1 = strip1.astype(np.int16)
+            strip2 = strip2.astype(np.int16)
+            diff_sum += np.abs(strip1 - strip2).reshape(count, -1).sum(axis=1)
+            sum1 += strip1.reshape(count, -1).sum(axis=1)
+            sum2 += strip2.reshape(count, -1).sum(axis=1)
+
+        # Calculate color difference in border regions
+        border_diff = diff_sum / area / 255 * 100
+
+        # Calculate if borders exist (checking if there's a significant color change in border regions)
+        border1_exists = sum1 / area > 10
+        border2_exists = sum2 / area > 10
+
+        # High difference if one has border and other doesn't
+        return np.where(border1_exists != border2_exists, np.maximum(border_diff, 80), border_diff)
+
+    def feature_params(self, positions=None):
+        """Analysis parameters that determine extracted features, used as part of the cache key"""
+        params = {
+            'frame_samples': self.frame_samples,
+            'size': [640, 480],
+            'canny': [100, 200],
+            'sampling': self.sampling,
+            'reader': self.reader
+        }
+        if positions is not None:
+            params['positions'] = [round(position, 6) for position in positions]
+        return params
+
+    def sample_positions(self, sampler):
+        """Where to sample a video that is not being aligned to another one"""
+        if self.sampling == 'scene':
+            return sampler.scene_positions(self.frame_samples)
+        if self.sampling == 'uniform':
+            return sampler.uniform_positions(self.frame_samples)
+        return None
+
+    def read_samples(self, sampler, positions, timer=NULL_TIMER):
+        """Yield (position, frame) for each sample, seeking past frames that are not needed"""
+        if positions is None or sampler.frame_count <= 0:
+            # Sequential: the first frame_samples frames. Positions can't
+            # be mapped to frames of a stream that doesn't report its length.
+            for index in range(self.frame_samples):
+                with timer.stage('decode'):
+                    frame = sampler.read()
+                if frame is None:
+                    return
+                yield index / max(sampler.frame_count, 1), frame
+            return
+
+        samples = sampler.read_positions(positions)
+        while True:
+            with timer.stage('decode'):
+                sample = next(samples, None)
+            if sample is None:
+                return
+            index, frame = sample
+            yield index / max(sampler.frame_count, 1), frame
+
+    def extract_features(self, video_path, timer=NULL_TIMER, positions=None):
+        """Decode the sampled frames of one video and precompute everything the metrics need.
+
+        Samples are stacked into contiguous (N, 480, 640, ...) arrays so
+        metrics can be computed across all of them at once. The result
+        can be compared against any number of other videos with
+        compare_features without decoding this one again. With a cache,
+        features of previously analyzed files are loaded instead.
+
+        positions are fractions of the clip length to sample at; pass
+        another video's features['positions'] to sample this one at the
+        matching moments. By default they follow the sampling mode.
+        """
+        params = self.feature_params(positions)
+        if self.cache is not None:
+            with timer.stage('cache_load'):
+                features = self.cache.load(video_path, params)
+            if features is not None:
+                return features
+
+        sampler = self.open_sampler(video_path)
+        if positions is None:
+            with timer.stage('sample_select'):
+                positions = self.sample_positions(sampler)
+        features = self.decode_features(sampler, positions, timer)
+        sampler.release()
+
+        if self.cache is not None:
+            with timer.stage('cache_store'):
+                self.cache.store(video_path, params, features)
+        return features
+
+    def open_sampler(self, video_path):
+        return FrameSampler(video_path, self.reader, size=(640, 480), threads=self.reader_threads)
+
+    def decode_features(self, sampler, positions, timer=NULL_TIMER):
+        """Features of the samples at positions (None: sequential) of an open sampler, bypassing the cache"""
+        capacity = self.frame_samples if positions is None else min(self.frame_samples, len(positions))
+        frames = np.empty((capacity, 480, 640, 3), dtype=np.uint8)
+        hsv = np.empty_like(frames)
+        edges = np.empty((capacity, 480, 640), dtype=np.uint8)
+        sampled_positions = []
+        pending = []
+
+        # Decode here while worker threads analyze the samples already read.
+        # Each sample owns its slot in the stacks, so thread timing cannot reorder results.
+        with ThreadPoolExecutor(self.workers) as pool:
+            for position, frame in self.read_samples(sampler, positions, timer):
+                count = len(pending)
+                if count == capacity:
+                    break
+
+                # Frames arrive at 640x480 from the reader; copy them into the stack
+                with timer.stage('stack'):
+                    frames[count] = frame
+                pending.append(pool.submit(self.process_sample, frames[count], edges[count], timer))
+                sampled_positions.append(position)
+
+            samples = [future.result() for future in pending]
+
+        count = len(samples)
+        keypoint_counts = [keypoint_count for keypoint_count, _ in samples]
+        descriptors = [frame_descriptors for _, frame_descriptors in samples]
+
+        # Whole-stack conversion, treating the samples as one tall image
+        with timer.stage('hsv'):
+            cv2.cvtColor(frames[:count].reshape(-1, 640, 3), cv2.COLOR_BGR2HSV,
+                         dst=hsv[:count].reshape(-1, 640, 3))
+
+        return {
+            'path': sampler.path,
+            'fps': sampler.fps,
+            'positions': sampled_positions,
+            'frames': frames[:count],
+            'hsv': hsv[:count],
+            'edges': edges[:count],
+            'keypoint_counts': np.array(keypoint_counts, dtype=np.int32),
+            'descriptors': descriptors
+        }
+
+    def process_sample(self, frame, edges, timer=NULL_TIMER):
+        """ORB features of a resized sample, and its Canny edges written into edges"""
+        with timer.stage('orb'):
+            keypoint_count, descriptors = self.detect_features(frame)
+        with timer.stage('edge'):
+            cv2.Canny(frame, 100, 200, edges=edges)
+        return keypoint_count, descriptors
+
+    def extract_aligned(self, video_path, reference, timer=NULL_TIMER):
+        """Extract features of a modified video at the moments sampled from the original.
+
+        Sampling at the same fraction of each clip maps timestamps by
+        the ratio of their durations, which for a re-timed variant is
+        its FPS ratio. Uniform positions depend only on frame_samples,
+        so those are recomputed rather than passed, keeping the cache
+        key independent of the reference.
+        """
+        if self.sampling == 'scene':
+            return self.extract_features(video_path, timer, positions=reference['positions'])
+        return self.extract_features(video_path, timer)
+
+    def channel_means(self, stack):
+        """Per-sample, per-channel means of an (N, H, W[, C]) uint8 stack, as an (N, 4) array.
+
+        cv2.sumElems reduces each contiguous sample with SIMD, which is
+        much faster than a NumPy mean over the strided channel axis.
+        """
+        pixels = stack.shape[1] * stack.shape[2]
+        return np.array([cv2.sumElems(sample) for sample in stack]).reshape(-1, 4) / pixels
+
+    def sample_differences(self, features1, features2, timer=NULL_TIMER):
+        """Per-sample values of every metric, pairing samples in order"""
+        count = min(len(features1['frames']), len(features2['frames']))
+        differences = {}
+
+        def zoom_difference(index):
+            return self.descriptor_difference(
+                features1['keypoint_counts'][index], features1['descriptors'][index],
+                features2['keypoint_counts'][index], features2['descriptors'][index]
+            )
+
+        # Calculate zoom difference; map() keeps results in sample order
+        with timer.stage('zoom'), ThreadPoolExecutor(self.workers) as pool:
+            differences['zoom_diff'] = np.array(list(pool.map(zoom_difference, range(count))),
+                                                dtype=np.float64)
+
+        # Calculate HSV differences; uint8 subtraction wraps, as in hsv_channel_differences
+        with timer.stage('hsv_diff'):
+            channel_means = self.channel_means(features1['hsv'][:count] - features2['hsv'][:count])
+        differences['hue_diff'] = channel_means[:, 0] / 180 * 100
+        differences['saturation_diff'] = channel_means[:, 1] / 255 * 100
+        differences['brightness_diff'] = channel_means[:, 2] / 255 * 100
+
+        # Border detection
+        with timer.stage('border'):
+            differences['border_diff'] = self.border_differences(
+                features1['frames'][:count], features2['frames'][:count])
+
+        # Edge detection difference
+        with timer.stage('edge_diff'):
+            edge_diff = cv2.absdiff(
+                np.ascontiguousarray(features1['edges'][:count]).reshape(-1, 640),
+                np.ascontiguousarray(features2['edges'][:count]).reshape(-1, 640)
+            )
+            differences['edge_diff'] = self.channel_means(edge_diff.reshape(count, -1, 640))[:, 0] / 255 * 100
+
+        # Overlay detection
+        with timer.stage('overlay'):
+            diff = cv2.absdiff(
+                np.ascontiguousarray(features1['frames'][:count]).reshape(-1, 640, 3),
+                np.ascontiguousarray(features2['frames'][:count]).reshape(-1, 640, 3)
+            )
+            differences['overlay_diff'] = (
+                self.channel_means(diff.reshape(count, -1, 640, 3))[:, :3].mean(axis=1) / 255 * 100)
+
+        for _ in range(count):
+            timer.count_frame()
+        return differences
+
+    def combine_results(self, fps1, fps2, differences):
+        """Average per-sample differences and weight them into the overall score"""
+        results = {key: 0 for key in METRIC_WEIGHTS}
+
+        # Compare video properties
+        results['speed_diff'] = self.calculate_speed_difference(fps1, fps2)
+
+        # Calculate average differences
+        for key, values in differences.items():
+            if len(values):
+                results[key] = float(np.mean(values))
+
+        # Calculate overall difference with weighted components
+        overall_difference = sum(
+            results[key] * weight for key, weight in METRIC_WEIGHTS.items())
+        results['overall_difference'] = overall_difference
+        results['overall_similarity'] = 100 - overall_difference
+
+        return results
+
+    def compare_features(self, features1, features2, timer=NULL_TIMER):
+        """Compare two videos' extracted features"""
+        differences = self.sample_differences(features1, features2, timer)
+        return self.combine_results(features1['fps'], features2['fps'], differences)
+
+    def sample_estimates(self, differences, fps1, fps2, confidence=0.95):
+        """Confidence intervals [low, high] of every metric mean and of overall_similarity.
+
+        The overall difference is a weighted sum of the metric means, so
+        its interval comes from the per-sample weighted sums, which
+        accounts for metrics moving together.
+        """
+        count = len(differences['zoom_diff'])
+        t = t_critical(confidence, count - 1) if count > 1 else math.inf
+
+        def interval(values):
+            if count == 0:
+                return [0.0, 100.0]
+            mean = float(np.mean(values))
+            half = t * float(np.std(values, ddof=1)) / math.sqrt(count) if count > 1 else math.inf
+            return [max(mean - half, 0.0), min(mean + half, 100.0)]
+
+        intervals = {key: interval(values) for key, values in differences.items()}
+        weighted = sum(METRIC_WEIGHTS[key] * np.asarray(values) for key, values in differences.items())
+        speed = METRIC_WEIGHTS['speed_diff'] * self.calculate_speed_difference(fps1, fps2)
+        low, high = interval(weighted)
+        intervals['overall_similarity'] = [100 - speed - high, 100 - speed - low]
+        return intervals
+
+    def compare_progressive(self, original_samples, candidate_path, positions, threshold, confidence=0.95,
+                            min_samples=5, step=2, timer=NULL_TIMER):
+        """Compare a few samples at a time until overall_similarity is clearly above or below threshold.
+
+        original_samples(indices) returns the original's features at
+        those indices into positions. The candidate is kept open and
+        decoded a round at a time (see SampleSource). Samples are taken
+        in spread_order,
+        so the ones used cover the whole clip; min_samples are compared
+        first, then step more per round, at most len(positions). The
+        results gain 'intervals' (confidence intervals of each metric
+        and the overall similarity), 'samples_used', 'decision'
+        ('similar' at or above threshold, else 'different') and
+        'settled' (whether the interval excludes the threshold).
+        Needs uniform or scene sampling.
+        """
+        if self.sampling == 'sequential':
+            raise ValueError("Progressive comparison needs uniform or scene sampling")
+
+        # As in extract_aligned: the candidate is sampled at the same positions as the original, and
+        # default uniform positions share the cache key of a full extraction
+        if self.sampling == 'uniform' and positions == FrameSampler.uniform_positions(self.frame_samples):
+            key_positions = None
+        else:
+            key_positions = positions
+        candidate = SampleSource(self, candidate_path, positions, key_positions, timer)
+
+        order = spread_order(len(positions))
+        differences = {}
+        used = 0
+        settled = False
+        try:
+            while used < len(order) and not settled:
+                size = max(min_samples, 2) if used == 0 else step
+                indices = sorted(order[used:used + size])
+                used += len(indices)
+
+                features1 = original_samples(indices)
+                features2 = candidate.features(indices)
+
+                for key, values in self.sample_differences(features1, features2, timer).items():
+                    differences[key] = np.concatenate([differences.get(key, np.empty(0)), values])
+                intervals = self.sample_estimates(differences, features1['fps'], features2['fps'], confidence)
+                low, high = intervals['overall_similarity']
+                settled = low >= threshold or high < threshold
+        finally:
+            candidate.close()
+
+        results = self.combine_results(features1['fps'], features2['fps'], differences)
+        results.update({
+            'threshold': threshold,
+            'confidence': confidence,
+            'intervals': intervals,
+            'samples_used': len(differences['zoom_diff']),
+            'samples_max': len(positions),
+            'decision': 'similar' if results['overall_similarity'] >= threshold else 'different',
+            'settled': settled
+        })
+        return results
+
+    def analyze_progressive(self, threshold, confidence=0.95, min_samples=5, step=2):
+        """Compare video1 with video2, stopping as soon as the result against threshold is settled.
+
+        Both videos are decoded only at the samples used; see
+        compare_progressive.
+        """
+        timer = StageTimer()
+        sampler = self.open_sampler(self.video1_path)
+        with timer.stage('sample_select'):
+            positions = self.sample_positions(sampler)
+        if self.sampling == 'scene':
+            # The frames' own positions, which the candidate is sampled at as in extract_aligned
+            positions = [sampler.index_at(position) / max(sampler.frame_count, 1) for position in positions]
+
+        original = SampleSource(self, self.video1_path, positions, timer=timer, sampler=sampler)
+        try:
+            results = self.compare_progressive(original.features, self.video2_path, positions, threshold,
+                                               confidence, min_samples, step, timer)
+        finally:
+            original.close()
+        self.metrics = timer.summary()
+        return results
+
+    def analyze_videos(self):
+        timer = StageTimer()
+        if self.sampling == 'scene':
+            features1 = self.extract_features(self.video1_path, timer)
+            features2 = self.extract_aligned(self.video2_path, features1, timer)
+        else:
+            # Sample positions don't depend on the original, so decode both videos at once
+            with ThreadPoolExecutor(2) as pool:
+                pending = pool.submit(self.extract_features, self.video1_path, timer)
+                features2 = self.extract_features(self.video2_path, timer)
+                features1 = pending.result()
+        results = self.compare_features(features1, features2, timer)
+        self.metrics = timer.summary()
+        return results
+
+    def analyze_batch(self, original_path, candidate_paths, threshold=None, confidence=0.95, min_samples=5):
+        """Compare one original against many candidates, extracting the original once.
+
+        Returns one entry per candidate, ranked from most to least
+        similar to the original. With a threshold, each candidate is
+        compared progressively (see compare_progressive) and only
+        decoded at the samples its decision needs.
+        """
+        timer = StageTimer()
+        original = self.extract_features(original_path, timer)
+
+        positions = original['positions']
+        if self.sampling == 'uniform' and len(positions) == self.frame_samples:
+            # Candidates are sampled at the same fractions as in a full comparison
+            positions = FrameSampler.uniform_positions(self.frame_samples)
+
+        ranking = []
+        for candidate_path in candidate_paths:
+            if threshold is not None:
+                results = self.compare_progressive(lambda indices: select_samples(original, indices),
+                                                   candidate_path, positions, threshold, confidence,
+                                                   min_samples, timer=timer)
+            else:
+                candidate = self.extract_aligned(candidate_path, original, timer)
+                results = self.compare_features(original, candidate, timer)
+            ranking.append({'path': candidate_path, 'results': results})
+
+        ranking.sort(key=lambda entry: entry['results']['overall_similarity'], reverse=True)
+        for rank, entry in enumerate(ranking, 1):
+            entry['rank'] = rank
+
+        self.metrics = timer.summary()
+        return ranking
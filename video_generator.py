@@ -1,12 +1,10 @@
-import cv2
-import numpy as np
-import random
-from pathlib import Path
 import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from threading import Thread
-from datetime import datetime
+
+from metrics import ProgressChannel
+from video_modifier import VideoModifier
 
 class VideoGeneratorUI:
     def __init__(self, root):
@@ -17,6 +15,7 @@ class VideoGeneratorUI:
         # Variables
         self.input_path = tk.StringVar()
         self.num_versions = tk.IntVar(value=5)
+        self.num_workers = tk.IntVar(value=min(4, os.cpu_count() or 1))
         self.status_var = tk.StringVar(value="Ready")
         self.progress_var = tk.DoubleVar(value=0)
         
@@ -25,6 +24,8 @@ class VideoGeneratorUI:
         self.color_var = tk.BooleanVar(value=True)
         self.border_var = tk.BooleanVar(value=True)
         self.zoom_var = tk.BooleanVar(value=True)
+        self.single_pass_var = tk.BooleanVar(value=True)
+        self.pipelined_var = tk.BooleanVar(value=True)
         
         # Effect parameters
         self.zoom_min = tk.DoubleVar(value=0.8)
@@ -32,7 +33,17 @@ class VideoGeneratorUI:
         self.speed_min = tk.DoubleVar(value=0.9)
         self.speed_max = tk.DoubleVar(value=1.4)
 
+        self.modifier = None
+
+        # Worker threads report through this channel; the Tk thread polls it
+        self.channel = ProgressChannel()
+
         self.setup_ui()
+        self.channel.poll(self.root, {
+            'progress': self.update_progress,
+            'status': self.update_status,
+            'done': self.generation_finished
+        })
 
     def setup_ui(self):
         # Main frame
@@ -52,6 +63,11 @@ class VideoGeneratorUI:
         ttk.Label(params_frame, text="Number of versions:").grid(row=0, column=0, sticky=tk.W)
         ttk.Entry(params_frame, textvariable=self.num_versions, width=10).grid(row=0, column=1, sticky=tk.W)
 
+        # Number of parallel workers
+        ttk.Label(params_frame, text="Parallel workers:").grid(row=4, column=0, sticky=tk.W)
+        self.workers_entry = ttk.Entry(params_frame, textvariable=self.num_workers, width=10)
+        self.workers_entry.grid(row=4, column=1, sticky=tk.W)
+
         # Effect toggles
         effects_frame = ttk.LabelFrame(params_frame, text="Effects", padding="5")
         effects_frame.grid(row=1, column=0, columnspan=2, pady=5, sticky=(tk.W, tk.E))
@@ -60,6 +76,9 @@ class VideoGeneratorUI:
         ttk.Checkbutton(effects_frame, text="Color Modification", variable=self.color_var).grid(row=0, column=1, sticky=tk.W)
         ttk.Checkbutton(effects_frame, text="Border Modification", variable=self.border_var).grid(row=1, column=0, sticky=tk.W)
         ttk.Checkbutton(effects_frame, text="Zoom Modification", variable=self.zoom_var).grid(row=1, column=1, sticky=tk.W)
+        ttk.Checkbutton(effects_frame, text="Single decode pass", variable=self.single_pass_var,
+                        command=self.update_workers_state).grid(row=2, column=0, sticky=tk.W)
+        ttk.Checkbutton(effects_frame, text="Pipelined decode/encode", variable=self.pipelined_var).grid(row=2, column=1, sticky=tk.W)
 
         # Speed controls
         speed_frame = ttk.LabelFrame(params_frame, text="Speed Settings", padding="5")
@@ -79,8 +98,11 @@ class VideoGeneratorUI:
         ttk.Label(zoom_frame, text="Max Zoom:").grid(row=0, column=2, sticky=tk.W)
         ttk.Entry(zoom_frame, textvariable=self.zoom_max, width=10).grid(row=0, column=3)
 
-        # Generate button
-        ttk.Button(main_frame, text="Generate Videos", command=self.start_generation).grid(row=2, column=0, columnspan=3, pady=10)
+        # Generate and cancel buttons
+        self.generate_button = ttk.Button(main_frame, text="Generate Videos", command=self.start_generation)
+        self.generate_button.grid(row=2, column=0, columnspan=2, pady=10)
+        self.cancel_button = ttk.Button(main_frame, text="Cancel", command=self.cancel_generation, state='disabled')
+        self.cancel_button.grid(row=2, column=2, pady=10)
 
         # Progress bar
         self.progress = ttk.Progressbar(main_frame, length=300, mode='determinate', variable=self.progress_var)
@@ -93,6 +115,12 @@ class VideoGeneratorUI:
         self.result_text = tk.Text(main_frame, height=15, width=70)
         self.result_text.grid(row=5, column=0, columnspan=3, pady=10)
 
+        self.update_workers_state()
+
+    def update_workers_state(self):
+        # A single decode pass renders every version in this process, so workers don't apply
+        self.workers_entry.configure(state='disabled' if self.single_pass_var.get() else 'normal')
+
     def browse_file(self):
         filename = filedialog.askopenfilename(
             filetypes=[
@@ -109,16 +137,12 @@ class VideoGeneratorUI:
             return
 
         # Disable generate button during processing
-        for widget in self.root.winfo_children():
-            if isinstance(widget, ttk.Button):
-                widget.configure(state='disabled')
+        self.generate_button.configure(state='disabled')
+        self.cancel_button.configure(state='normal')
 
-        # Start generation in a separate thread
-        Thread(target=self.generate_videos, daemon=True).start()
-
-    def generate_videos(self):
+        # Read Tk variables here, on the Tk thread
         try:
-            modifier = VideoModifier(
+            self.modifier = VideoModifier(
                 self.input_path.get(),
                 self.speed_var.get(),
                 self.color_var.get(),
@@ -128,177 +152,61 @@ class VideoGeneratorUI:
                 self.zoom_max.get(),
                 self.speed_min.get(),
                 self.speed_max.get(),
-                self.update_progress,
-                self.update_status
+                self.channel.progress,
+                self.channel.status,
+                pipelined=self.pipelined_var.get()
             )
-            modifier.generate_multiple_versions(self.num_versions.get())
-            
+            options = {
+                'num_versions': self.num_versions.get(),
+                'single_pass': self.single_pass_var.get(),
+                'workers': 1 if self.single_pass_var.get() else self.num_workers.get()
+            }
+        except Exception as e:
+            self.generation_finished(('error', str(e)))
+            return
+
+        # Start generation in a separate thread
+        Thread(target=self.generate_videos, args=(self.modifier, options), daemon=True).start()
+
+    def cancel_generation(self):
+        if self.modifier:
+            self.status_var.set("Cancelling...")
+            self.modifier.cancel()
+
+    def generate_videos(self, modifier, options):
+        # Runs on a worker thread: report back only through the channel
+        try:
+            modifier.generate_multiple_versions(**options)
+            if modifier.is_cancelled():
+                self.channel.post('done', ('cancelled', None))
+            else:
+                self.channel.post('done', ('completed', None))
+        except Exception as e:
+            self.channel.post('done', ('error', str(e)))
+
+    def generation_finished(self, outcome):
+        state, error = outcome
+        if state == 'cancelled':
+            self.status_var.set("Generation cancelled")
+        elif state == 'completed':
             self.status_var.set("Generation completed!")
             messagebox.showinfo("Success", "Video generation completed successfully!")
-        except Exception as e:
-            self.status_var.set(f"Error: {str(e)}")
-            messagebox.showerror("Error", str(e))
-        finally:
-            # Re-enable generate button
-            for widget in self.root.winfo_children():
-                if isinstance(widget, ttk.Button):
-                    widget.configure(state='normal')
-            self.progress_var.set(0)
+        else:
+            self.status_var.set(f"Error: {error}")
+            messagebox.showerror("Error", error)
+
+        # Re-enable generate button
+        self.generate_button.configure(state='normal')
+        self.cancel_button.configure(state='disabled')
+        self.progress_var.set(0)
+        self.modifier = None
 
     def update_progress(self, value):
         self.progress_var.set(value)
-        self.root.update_idletasks()
 
     def update_status(self, message):
         self.result_text.insert(tk.END, message + "\n")
         self.result_text.see(tk.END)
-        self.root.update_idletasks()
-
-class VideoModifier:
-    def __init__(self, input_video_path, use_speed=True, use_color=True, 
-             use_border=True, use_zoom=True, zoom_min=0.8, zoom_max=1.1,
-             speed_min=0.9, speed_max=1.4, progress_callback=None, 
-             status_callback=None):
-        self.input_path = input_video_path
-        self.use_speed = use_speed
-        self.use_color = use_color
-        self.use_border = use_border
-        self.use_zoom = use_zoom
-        self.zoom_min = zoom_min
-        self.zoom_max = zoom_max
-        self.speed_min = speed_min
-        self.speed_max = speed_max
-        self.progress_callback = progress_callback
-        self.status_callback = status_callback
-        
-        # Fixed output resolution
-        self.output_width = 1080
-        self.output_height = 1920
-        
-        self.cap = cv2.VideoCapture(input_video_path)
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
-        self.input_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.input_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-    def apply_zoom(self, frame, zoom_factor):
-        """Apply zoom to frame"""
-        if zoom_factor == 1.0:
-            return frame
-
-        height, width = frame.shape[:2]
-        center_x, center_y = width // 2, height // 2
-
-        # Calculate new dimensions
-        new_width = int(width / zoom_factor)
-        new_height = int(height / zoom_factor)
-
-        # Calculate crop ranges
-        start_x = center_x - new_width // 2
-        start_y = center_y - new_height // 2
-        end_x = start_x + new_width
-        end_y = start_y + new_height
-
-        # Ensure crop coordinates are within bounds
-        start_x = max(0, start_x)
-        start_y = max(0, start_y)
-        end_x = min(width, end_x)
-        end_y = min(height, end_y)
-
-        # Crop and resize
-        cropped = frame[start_y:end_y, start_x:end_x]
-        return cv2.resize(cropped, (width, height), interpolation=cv2.INTER_LINEAR)
-
-    def generate_modified_video(self, output_path):
-        # Random modifications within reasonable ranges
-        speed_factor = random.uniform(self.speed_min, self.speed_max) if self.use_speed else 1.0
-        zoom_factor = random.uniform(self.zoom_min, self.zoom_max) if self.use_zoom else 1.0
-        
-        hue_shift = random.randint(-15, 15) if self.use_color else 0
-        saturation_factor = random.uniform(0.9, 1.1) if self.use_color else 1.0
-        brightness_factor = random.uniform(0.9, 1.1) if self.use_color else 1.0
-        
-        border_size = random.randint(0, 4) if self.use_border else 0
-        border_color = (
-            random.randint(0, 50),
-            random.randint(0, 50),
-            random.randint(0, 50)
-        ) if self.use_border else (0, 0, 0)
-
-        # Create video writer with fixed output resolution
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(
-            output_path,
-            fourcc,
-            self.fps * speed_factor,
-            (self.output_width, self.output_height)
-        )
-
-        frame_number = 0
-        while self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-
-            # Resize frame to target resolution
-            frame = cv2.resize(frame, (self.output_width, self.output_height), 
-                              interpolation=cv2.INTER_LINEAR)
-
-            # Apply zoom if enabled
-            if self.use_zoom:
-                frame = self.apply_zoom(frame, zoom_factor)
-
-            # Apply color modifications
-            if self.use_color:
-                hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-                hsv = hsv.astype(np.float32)
-                
-                hsv[:, :, 0] = (hsv[:, :, 0] + hue_shift) % 180
-                hsv[:, :, 1] = np.clip(hsv[:, :, 1] * saturation_factor, 0, 255)
-                hsv[:, :, 2] = np.clip(hsv[:, :, 2] * brightness_factor, 0, 255)
-                
-                hsv = hsv.astype(np.uint8)
-                frame = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
-
-            # Apply border
-            if self.use_border and border_size > 0:
-                frame = cv2.copyMakeBorder(
-                    frame,
-                    border_size, border_size, border_size, border_size,
-                    cv2.BORDER_CONSTANT,
-                    value=border_color
-                )
-                frame = cv2.resize(frame, (self.output_width, self.output_height))
-
-            out.write(frame)
-            frame_number += 1
-
-            # Update progress
-            if self.progress_callback:
-                progress = (frame_number / self.frame_count) * 100
-                self.progress_callback(progress)
-
-        self.cap.release()
-        out.release()
-
-    def generate_multiple_versions(self, num_versions=5):
-        input_path = Path(self.input_path)
-        output_dir = input_path.parent / "modified_versions"
-        output_dir.mkdir(exist_ok=True)
-
-        for i in range(num_versions):
-            output_path = str(output_dir / f"modified_{datetime.now().strftime('%Y%m%d_%H%M%S')}{input_path.suffix}")
-            if self.status_callback:
-                self.status_callback(f"Generating version {i+1}...")
-            
-            # Reset video capture for each version
-            self.cap = cv2.VideoCapture(self.input_path)
-            
-            # Generate modified version
-            self.generate_modified_video(output_path)
-            
-        if self.status_callback:
-            self.status_callback("All versions generated successfully!")
 
 def main():
     root = tk.Tk()
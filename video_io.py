@@ -0,0 +1,408 @@
+"""Video reader and writer backends.
+
+    open_reader('opencv', path)                      # cv2.VideoCapture
+    open_reader('ffmpeg', path, size=(640, 480), threads=4)
+    create_writer('opencv', path, fps, size)        # cv2.VideoWriter, mp4v
+    create_writer('ffmpeg', path, fps, size, codec='libx264', preset='veryfast', crf=23)
+
+Readers return BGR uint8 frames from read() (None at the end), or fill
+a caller's array with read_into(buffer), and can seek to a frame index; writers take BGR uint8 frames of the given size
+in write(). Both have release().
+"""
+import os
+import re
+import subprocess
+import tempfile
+
+import cv2
+import numpy as np
+
+READER_BACKENDS = ('opencv', 'ffmpeg')
+WRITER_BACKENDS = ('opencv', 'ffmpeg')
+
+# Forward gaps up to this many frames are read through rather than seeked
+SEEK_THRESHOLD = 30
+
+
+class VideoReader:
+    """Frame source with optional crop (x0, y0, x1, y1), resize to size (width, height)
+    and a black border of pad (x, y) pixels around the result.
+
+    Subclasses set fps, frame_count, width and height (of the source)
+    and implement read(), read_into(buffer), grab(), restart(index) and release().
+    """
+
+    def __init__(self, path, size=None, crop=None, pad=None):
+        self.path = str(path)
+        self.size = size
+        self.crop = crop
+        self.pad = pad if pad and any(pad) else None
+        self.position = 0
+
+    def probe(self):
+        """Read stream properties with OpenCV, which every backend already depends on"""
+        cap = cv2.VideoCapture(self.path)
+        self.opened = cap.isOpened()
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        return cap
+
+    @property
+    def output_size(self):
+        """(width, height) of the frames read() returns"""
+        if self.size:
+            width, height = self.size
+        elif self.crop:
+            x0, y0, x1, y1 = self.crop
+            width, height = x1 - x0, y1 - y0
+        else:
+            width, height = self.width, self.height
+        if self.pad:
+            width, height = width + 2 * self.pad[0], height + 2 * self.pad[1]
+        return width, height
+
+    def seek(self, index):
+        """Move so the next read() returns frame index, decoding as little as possible"""
+        gap = index - self.position
+        if 0 <= gap <= SEEK_THRESHOLD:
+            for _ in range(gap):
+                if not self.grab():
+                    return False
+            return True
+        self.restart(index)
+        return True
+
+
+class OpenCVReader(VideoReader):
+    """cv2.VideoCapture; crop, resize and pad are applied to each decoded frame"""
+
+    def __init__(self, path, size=None, crop=None, pad=None):
+        super().__init__(path, size, crop, pad)
+        self.cap = self.probe()
+
+    def read(self):
+        if not self.cap.isOpened():
+            return None
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self.position += 1
+
+        if self.crop:
+            x0, y0, x1, y1 = self.crop
+            frame = frame[y0:y1, x0:x1]
+        if self.size and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+            frame = cv2.resize(frame, tuple(self.size), interpolation=cv2.INTER_LINEAR)
+        if self.pad:
+            pad_x, pad_y = self.pad
+            frame = cv2.copyMakeBorder(frame, pad_y, pad_y, pad_x, pad_x, cv2.BORDER_CONSTANT)
+        return frame
+
+    def read_into(self, buffer):
+        """Fill buffer with the next frame; returns False at the end of the stream"""
+        if self.crop or self.size or self.pad:
+            frame = self.read()
+            if frame is None:
+                return False
+            buffer[...] = frame
+            return True
+
+        if not self.cap.isOpened():
+            return False
+        # VideoCapture decodes straight into buffer when its shape matches
+        ret, frame = self.cap.read(buffer)
+        if not ret:
+            return False
+        if frame is not buffer:
+            buffer[...] = frame
+        self.position += 1
+        return True
+
+    def grab(self):
+        # Skips the BGR conversion and copy of the frame
+        if not self.cap.grab():
+            return False
+        self.position += 1
+        return True
+
+    def restart(self, index):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        self.position = index
+
+    def release(self):
+        self.cap.release()
+
+
+class FFmpegReader(VideoReader):
+    """Decode through an ffmpeg subprocess that crops, scales, pads and converts to BGR itself.
+
+    Frames arrive at their final size, so no full-resolution copy is
+    made in this process. Seeking restarts ffmpeg with an input -ss,
+    which decodes from the preceding keyframe and drops frames up to
+    the target, so it is frame-accurate. threads sets ffmpeg's decoder
+    threads (0: automatic).
+    """
+
+    def __init__(self, path, size=None, crop=None, pad=None, threads=0, ffmpeg='ffmpeg'):
+        super().__init__(path, size, crop, pad)
+        self.threads = threads
+        self.ffmpeg = ffmpeg
+        self.probe().release()
+        self.process = None
+        self.log = None
+
+        width, height = self.output_size
+        self.frame_shape = (height, width, 3)
+        self.frame_bytes = width * height * 3
+        # Target for frames that are skipped over
+        self.scratch = np.empty(self.frame_shape, dtype=np.uint8)
+
+    def filters(self):
+        filters = []
+        if self.crop:
+            x0, y0, x1, y1 = self.crop
+            filters.append(f"crop={x1 - x0}:{y1 - y0}:{x0}:{y0}")
+        if self.size:
+            width, height = self.size
+            filters.append(f"scale={width}:{height}:flags=bilinear")
+        if self.pad:
+            width, height = self.output_size
+            filters.append(f"pad={width}:{height}:{self.pad[0]}:{self.pad[1]}")
+        return filters
+
+    def start(self):
+        """Launch ffmpeg decoding from the current position"""
+        command = [self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-nostdin',
+                   '-threads', str(self.threads)]
+        if self.position > 0:
+            # Half a frame early, so rounding never skips the target frame
+            command += ['-ss', f"{(self.position - 0.5) / self.fps:.6f}"]
+        command += ['-i', self.path, '-map', '0:v:0', '-an', '-sn', '-vsync', 'passthrough']
+        filters = self.filters()
+        if filters:
+            command += ['-vf', ",".join(filters)]
+        command += ['-f', 'rawvideo', '-pix_fmt', 'bgr24', '-']
+
+        self.log = tempfile.TemporaryFile()
+        try:
+            self.process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=self.log,
+                                            bufsize=self.frame_bytes)
+        except FileNotFoundError:
+            self.log.close()
+            raise RuntimeError(f"ffmpeg executable not found: {self.ffmpeg}")
+
+    def stop(self):
+        if self.process is None:
+            return
+        self.process.stdout.close()
+        self.process.kill()
+        self.process.wait()
+        self.log.close()
+        self.process = None
+
+    def read_into(self, buffer):
+        """Fill buffer with the next frame; returns False at the end of the stream"""
+        if not self.opened:
+            return False
+        if self.process is None:
+            self.start()
+
+        view = memoryview(buffer).cast('B')
+        filled = 0
+        while filled < self.frame_bytes:
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+
+        if filled < self.frame_bytes:
+            returncode = self.process.wait()
+            if returncode != 0:
+                self.log.seek(0)
+                message = self.log.read().decode(errors='replace').strip()
+                self.stop()
+                raise RuntimeError(f"ffmpeg failed to decode {self.path}: {message}")
+            return False
+
+        self.position += 1
+        return True
+
+    def read(self):
+        frame = np.empty(self.frame_shape, dtype=np.uint8)
+        return frame if self.read_into(frame) else None
+
+    def grab(self):
+        return self.read_into(self.scratch)
+
+    def restart(self, index):
+        self.stop()
+        self.position = index
+
+    def release(self):
+        self.stop()
+
+
+def open_reader(backend, path, size=None, crop=None, pad=None, threads=0):
+    """Open a frame reader; crop, size and pad are applied by the backend"""
+    if backend == 'ffmpeg':
+        return FFmpegReader(path, size=size, crop=crop, pad=pad, threads=threads)
+    if backend == 'opencv':
+        return OpenCVReader(path, size=size, crop=crop, pad=pad)
+    raise ValueError(f"Unknown reader backend: {backend}")
+
+
+def atempo_filter(speed_factor):
+    """ffmpeg audio filter that plays audio speed_factor times faster, keeping pitch.
+
+    Older ffmpeg builds accept atempo values in [0.5, 2] only, so larger
+    changes are chained.
+    """
+    factors = []
+    while speed_factor > 2.0:
+        factors.append(2.0)
+        speed_factor /= 2.0
+    while speed_factor < 0.5:
+        factors.append(0.5)
+        speed_factor /= 0.5
+    factors.append(speed_factor)
+    return ",".join(f"atempo={factor:.6f}" for factor in factors)
+
+
+class FFmpegWriter:
+    """Encode frames by streaming raw BGR pixels into an ffmpeg subprocess.
+
+    Encoding runs in the ffmpeg process, on its own threads, so the
+    caller only pays for the pipe copy. With audio_source, the first
+    audio track of that file (if it has one) is muxed in, sped up by
+    audio_tempo to stay in sync with re-timed video.
+    """
+
+    def __init__(self, output_path, fps, size, codec='libx264', preset='veryfast', crf=23,
+                 threads=0, audio_source=None, audio_tempo=1.0, ffmpeg='ffmpeg'):
+        width, height = size
+        self.frame_bytes = width * height * 3
+        self.shape = (height, width, 3)
+
+        command = [
+            ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f"{width}x{height}", '-r', f"{fps:.6f}",
+            '-i', '-'
+        ]
+        if audio_source:
+            command += ['-i', str(audio_source)]
+
+        command += ['-map', '0:v:0', '-c:v', codec, '-pix_fmt', 'yuv420p', '-threads', str(threads)]
+        if preset:
+            command += ['-preset', preset]
+        if crf is not None:
+            command += ['-crf', str(crf)]
+
+        if audio_source:
+            # The trailing '?' makes the audio track optional
+            command += ['-map', '1:a:0?', '-shortest']
+            if abs(audio_tempo - 1.0) > 1e-6:
+                command += ['-af', atempo_filter(audio_tempo), '-c:a', 'aac']
+            else:
+                command += ['-c:a', 'copy']
+
+        command.append(str(output_path))
+
+        # ffmpeg's messages go to a file so a full stderr pipe can never stall encoding
+        self.log = tempfile.TemporaryFile()
+        try:
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                            stderr=self.log)
+        except FileNotFoundError:
+            self.log.close()
+            raise RuntimeError(f"ffmpeg executable not found: {ffmpeg}")
+
+    def error_message(self):
+        self.log.seek(0)
+        return self.log.read().decode(errors='replace').strip()
+
+    def write(self, frame):
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match writer size {self.shape}")
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except BrokenPipeError:
+            self.process.wait()
+            raise RuntimeError(f"ffmpeg exited while encoding: {self.error_message()}")
+
+    def release(self):
+        """Flush the encoder and wait for ffmpeg; raises if it failed"""
+        if self.process.stdin.closed:
+            return
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.process.wait()
+        message = self.error_message()
+        self.log.close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed with exit code {returncode}: {message}")
+
+
+def create_writer(backend, output_path, fps, size, **options):
+    """Open a writer for BGR frames of size (width, height) using the named backend"""
+    if backend == 'ffmpeg':
+        return FFmpegWriter(output_path, fps, size, **options)
+    if backend == 'opencv':
+        return cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    raise ValueError(f"Unknown writer backend: {backend}")
+
+
+def keyframe_indices(path, fps, ffmpeg='ffmpeg'):
+    """Frame indices of the keyframes of a video, or [] if ffmpeg cannot list them.
+
+    Only keyframes are decoded (-skip_frame nokey), so this is fast
+    even for long inputs.
+    """
+    command = [ffmpeg, '-hide_banner', '-nostdin', '-skip_frame', 'nokey', '-i', str(path),
+               '-map', '0:v:0', '-vf', 'showinfo', '-vsync', 'passthrough', '-f', 'null', '-']
+    try:
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        return []
+    if result.returncode != 0 or not fps:
+        return []
+
+    times = re.findall(r"pts_time:\s*([0-9.]+)", result.stderr.decode(errors='replace'))
+    return sorted({round(float(time) * fps) for time in times})
+
+
+def concat_segments(segment_paths, output_path, audio_source=None, audio_tempo=1.0, ffmpeg='ffmpeg'):
+    """Join video segments encoded with identical settings into one file without re-encoding.
+
+    With audio_source, its first audio track (if any) is muxed in,
+    re-timed by audio_tempo like FFmpegWriter does.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as list_file:
+        for segment_path in segment_paths:
+            escaped = os.path.abspath(segment_path).replace("'", "'\\''")
+            list_file.write(f"file '{escaped}'\n")
+
+    command = [ffmpeg, '-hide_banner', '-loglevel', 'error', '-nostdin', '-y',
+               '-f', 'concat', '-safe', '0', '-i', list_file.name]
+    if audio_source:
+        command += ['-i', str(audio_source)]
+    command += ['-map', '0:v:0', '-c:v', 'copy']
+    if audio_source:
+        command += ['-map', '1:a:0?', '-shortest']
+        if abs(audio_tempo - 1.0) > 1e-6:
+            command += ['-af', atempo_filter(audio_tempo), '-c:a', 'aac']
+        else:
+            command += ['-c:a', 'copy']
+    command.append(str(output_path))
+
+    try:
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError(f"ffmpeg executable not found: {ffmpeg}")
+    finally:
+        os.remove(list_file.name)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to join segments: {result.stderr.decode(errors='replace').strip()}")
@@ -0,0 +1,864 @@
+import cv2
+import math
+import numpy as np
+import random
+from pathlib import Path
+import os
+import queue
+import shutil
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from threading import Event
+
+from frame_buffers import FrameBuffers
+from frame_pipeline import FramePipeline
+from metrics import StageTimer, NULL_TIMER, combine_summaries
+from variant_plan import VariantPlan
+from video_io import concat_segments, create_writer, keyframe_indices, open_reader
+
+# 'fps': write every frame at fps * speed; 'resample': drop or repeat frames at a fixed output fps
+SPEED_MODES = ('fps', 'resample')
+# Seconds between per-segment progress lines on status_callback
+SEGMENT_STATUS_INTERVAL = 1.0
+
+
+def partial_path(output_path):
+    """Hidden name an output is written under until it is complete"""
+    output = Path(output_path)
+    return str(output.with_name(f".{output.stem}.partial{output.suffix}"))
+
+
+def remove_if_exists(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+class VideoModifier:
+    def __init__(self, input_video_path, use_speed=True, use_color=True, 
+             use_border=True, use_zoom=True, zoom_min=0.8, zoom_max=1.1,
+             speed_min=0.9, speed_max=1.4, progress_callback=None, 
+             status_callback=None, cancel_event=None, pipelined=False,
+             transform_workers=2, writer='opencv', writer_options=None, reader='opencv',
+             reader_threads=0, buffer_pool=False, speed_mode='fps', output_fps=None):
+        self.input_path = input_video_path
+        self.use_speed = use_speed
+        self.use_color = use_color
+        self.use_border = use_border
+        self.use_zoom = use_zoom
+        self.zoom_min = zoom_min
+        self.zoom_max = zoom_max
+        self.speed_min = speed_min
+        self.speed_max = speed_max
+        self.progress_callback = progress_callback
+        self.status_callback = status_callback
+        self.cancel_event = cancel_event if cancel_event is not None else Event()
+        self.pipelined = pipelined
+        self.transform_workers = transform_workers
+        # Writer backend (see video_io.create_writer) and its options; for
+        # ffmpeg, 'audio': True also carries the input's audio over
+        self.writer = writer
+        self.writer_options = dict(writer_options or {})
+        # Reader backend (see video_io.open_reader) and its decoder thread count
+        self.reader = reader
+        self.reader_threads = reader_threads
+        # Reuse preallocated working buffers for every frame instead of
+        # allocating new arrays; frames then only live until the next one
+        # is read, which the pipelined mode can't guarantee
+        if buffer_pool and pipelined:
+            raise ValueError("buffer_pool can't be combined with pipelined")
+        self.buffer_pool = buffer_pool
+        self.buffers = FrameBuffers() if buffer_pool else None
+        if speed_mode not in SPEED_MODES:
+            raise ValueError(f"Unknown speed mode {speed_mode!r}, expected one of {SPEED_MODES}")
+        self.speed_mode = speed_mode
+        self.color_luts = {}
+        self.geometries = {}
+        # Per-output stage timings, see metrics.StageTimer.summary
+        self.metrics = {}
+        
+        # Fixed output resolution
+        self.output_width = 1080
+        self.output_height = 1920
+        
+        self.cap = self.open_input()
+        self.fps = self.cap.fps
+        self.input_width = self.cap.width
+        self.input_height = self.cap.height
+        self.frame_count = self.cap.frame_count
+        # Frame rate of resampled outputs; the input's by default
+        self.output_fps = output_fps or self.fps
+
+    def get_settings(self):
+        """Picklable constructor arguments for rebuilding this modifier in a worker"""
+        return {
+            'input_video_path': self.input_path,
+            'use_speed': self.use_speed,
+            'use_color': self.use_color,
+            'use_border': self.use_border,
+            'use_zoom': self.use_zoom,
+            'zoom_min': self.zoom_min,
+            'zoom_max': self.zoom_max,
+            'speed_min': self.speed_min,
+            'speed_max': self.speed_max,
+            'pipelined': self.pipelined,
+            'transform_workers': self.transform_workers,
+            'writer': self.writer,
+            'writer_options': self.writer_options,
+            'reader': self.reader,
+            'reader_threads': self.reader_threads,
+            'buffer_pool': self.buffer_pool,
+            'speed_mode': self.speed_mode,
+            'output_fps': self.output_fps
+        }
+
+    def output_settings(self):
+        """Settings besides the variant parameters that change the rendered file"""
+        return {
+            'writer': self.writer,
+            'writer_options': self.writer_options,
+            'reader': self.reader,
+            'speed_mode': self.speed_mode,
+            # The output rate only applies when resampling
+            'output_fps': self.output_fps if self.speed_mode == 'resample' else None
+        }
+
+    def cancel(self):
+        """Request a running generation to stop after the current frame"""
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def apply_zoom(self, frame, zoom_factor):
+        """Apply zoom to frame"""
+        if zoom_factor == 1.0:
+            return frame
+
+        height, width = frame.shape[:2]
+        center_x, center_y = width // 2, height // 2
+
+        # Calculate new dimensions
+        new_width = int(width / zoom_factor)
+        new_height = int(height / zoom_factor)
+
+        # Calculate crop ranges
+        start_x = center_x - new_width // 2
+        start_y = center_y - new_height // 2
+        end_x = start_x + new_width
+        end_y = start_y + new_height
+
+        # Ensure crop coordinates are within bounds
+        start_x = max(0, start_x)
+        start_y = max(0, start_y)
+        end_x = min(width, end_x)
+        end_y = min(height, end_y)
+
+        # Crop and resize
+        cropped = frame[start_y:end_y, start_x:end_x]
+        return cv2.resize(cropped, (width, height), interpolation=cv2.INTER_LINEAR)
+
+    def get_zoom_crop(self, zoom_factor):
+        """Crop rectangle (x, y, width, height) that apply_zoom takes from an output-sized frame"""
+        width, height = self.output_width, self.output_height
+        if zoom_factor == 1.0:
+            return 0, 0, width, height
+
+        center_x, center_y = width // 2, height // 2
+        new_width = int(width / zoom_factor)
+        new_height = int(height / zoom_factor)
+
+        start_x = max(0, center_x - new_width // 2)
+        start_y = max(0, center_y - new_height // 2)
+        end_x = min(width, center_x - new_width // 2 + new_width)
+        end_y = min(height, center_y - new_height // 2 + new_height)
+        return start_x, start_y, end_x - start_x, end_y - start_y
+
+    def get_border_inset(self, border_size, output_size):
+        """Width in output pixels of a border added before re-resizing to output_size"""
+        return round(border_size * output_size / (output_size + 2 * border_size))
+
+    def build_geometry(self, input_width, input_height, zoom_factor, border_size):
+        """Collapse resize, zoom crop and border re-resize into one resample.
+
+        Every stage is an axis-aligned scale plus offset, so the chain
+        composes into a single map from output pixels back to input
+        pixels. Returns the input rectangle (x0, y0, x1, y1) that lands
+        inside the border, and the border inset (x, y) around it.
+        """
+        crop_x, crop_y, crop_width, crop_height = self.get_zoom_crop(zoom_factor)
+
+        def stage(src_size, dst_size, shift=0.0):
+            # Pixel-centre mapping used by cv2.resize: x_src = scale * x_dst + offset
+            scale = src_size / dst_size
+            return scale, 0.5 * scale - 0.5 + shift
+
+        def compose(outer, inner):
+            return outer[0] * inner[0], outer[0] * inner[1] + outer[1]
+
+        rect = []
+        insets = []
+        for input_size, output_size, crop_start, crop_size in (
+            (input_width, self.output_width, crop_x, crop_width),
+            (input_height, self.output_height, crop_y, crop_height)
+        ):
+            border = stage(output_size + 2 * border_size, output_size, -border_size)
+            zoom = stage(crop_size, output_size, crop_start)
+            resize = stage(input_size, output_size)
+            scale, offset = compose(resize, compose(zoom, border))
+
+            # Map the pixel edges of the content area into the input frame
+            inset = self.get_border_inset(border_size, output_size)
+            edge_offset = offset + 0.5 - 0.5 * scale
+            start = min(max(round(scale * inset + edge_offset), 0), input_size - 1)
+            end = min(max(round(scale * (output_size - inset) + edge_offset), start + 1), input_size)
+            rect.append((start, end))
+            insets.append(inset)
+
+        (x0, x1), (y0, y1) = rect
+        return (x0, y0, x1, y1), tuple(insets)
+
+    def get_geometry(self, frame, params):
+        """Return the cached geometry for a variant and input frame"""
+        height, width = frame.shape[:2]
+        return self.get_geometry_for_size(width, height, params)
+
+    def get_geometry_for_size(self, width, height, params):
+        """Return the cached geometry for a variant and input frame size"""
+        zoom_factor = params['zoom_factor'] if self.use_zoom else 1.0
+        border_size = params['border_size'] if self.use_border else 0
+        key = (width, height, zoom_factor, border_size)
+        if key not in self.geometries:
+            self.geometries[key] = self.build_geometry(*key)
+        return self.geometries[key]
+
+    def get_content_size(self, insets):
+        """Size of the resampled picture inside the border"""
+        inset_x, inset_y = insets
+        return self.output_width - 2 * inset_x, self.output_height - 2 * inset_y
+
+    def apply_geometry(self, frame, params, buffers=None):
+        """Resample the decoded frame once, straight into the zoomed and bordered output"""
+        (x0, y0, x1, y1), insets = self.get_geometry(frame, params)
+        if buffers is None:
+            content = cv2.resize(frame[y0:y1, x0:x1], self.get_content_size(insets),
+                                 interpolation=cv2.INTER_LINEAR)
+            return self.place_content(content, insets)
+
+        # Resample into the middle of the reused output frame
+        inset_x, inset_y = insets
+        output = buffers.get('output', (self.output_height, self.output_width, 3))
+        content = output[inset_y:self.output_height - inset_y, inset_x:self.output_width - inset_x]
+        cv2.resize(frame[y0:y1, x0:x1], self.get_content_size(insets), dst=content,
+                   interpolation=cv2.INTER_LINEAR)
+        return output
+
+    def place_content(self, content, insets):
+        """Put resampled content in the middle of an output frame"""
+        inset_x, inset_y = insets
+        if inset_x == 0 and inset_y == 0:
+            return content
+
+        # Border strips are filled by apply_border
+        output = np.empty((self.output_height, self.output_width, 3), dtype=np.uint8)
+        output[inset_y:self.output_height - inset_y, inset_x:self.output_width - inset_x] = content
+        return output
+
+    def apply_border(self, frame, params):
+        """Paint the border strips around the resampled content"""
+        border_size = params['border_size']
+        inset_x = self.get_border_inset(border_size, self.output_width)
+        inset_y = self.get_border_inset(border_size, self.output_height)
+        color = params['border_color']
+        if inset_y > 0:
+            frame[:inset_y] = color
+            frame[-inset_y:] = color
+        if inset_x > 0:
+            frame[:, :inset_x] = color
+            frame[:, -inset_x:] = color
+        return frame
+
+    def generate_variant_params(self, rng=None):
+        """Draw random modification parameters for one variant.
+
+        rng is a random.Random to draw from; the module-level generator
+        is used when it is omitted.
+        """
+        rng = rng or random
+        # Random modifications within reasonable ranges
+        speed_factor = rng.uniform(self.speed_min, self.speed_max) if self.use_speed else 1.0
+        zoom_factor = rng.uniform(self.zoom_min, self.zoom_max) if self.use_zoom else 1.0
+        
+        hue_shift = rng.randint(-15, 15) if self.use_color else 0
+        saturation_factor = rng.uniform(0.9, 1.1) if self.use_color else 1.0
+        brightness_factor = rng.uniform(0.9, 1.1) if self.use_color else 1.0
+        
+        border_size = rng.randint(0, 4) if self.use_border else 0
+        border_color = (
+            rng.randint(0, 50),
+            rng.randint(0, 50),
+            rng.randint(0, 50)
+        ) if self.use_border else (0, 0, 0)
+
+        return {
+            'speed_factor': speed_factor,
+            'zoom_factor': zoom_factor,
+            'hue_shift': hue_shift,
+            'saturation_factor': saturation_factor,
+            'brightness_factor': brightness_factor,
+            'border_size': border_size,
+            'border_color': border_color
+        }
+
+    @staticmethod
+    def build_color_lut(hue_shift, saturation_factor, brightness_factor):
+        """Precompile the HSV adjustment into a 3-channel uint8 lookup table"""
+        levels = np.arange(256, dtype=np.float32)
+        lut = np.empty((1, 256, 3), dtype=np.uint8)
+        lut[0, :, 0] = (levels + hue_shift) % 180
+        lut[0, :, 1] = np.clip(levels * saturation_factor, 0, 255)
+        lut[0, :, 2] = np.clip(levels * brightness_factor, 0, 255)
+        return lut
+
+    def get_color_lut(self, params):
+        """Return the cached color lookup table for a variant"""
+        key = (params['hue_shift'], params['saturation_factor'], params['brightness_factor'])
+        if key not in self.color_luts:
+            self.color_luts[key] = self.build_color_lut(*key)
+        return self.color_luts[key]
+
+    def apply_color(self, frame, params, buffers=None):
+        """Apply hue/saturation/brightness shift with a single table lookup in HSV"""
+        if buffers is None:
+            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+            hsv = cv2.LUT(hsv, self.get_color_lut(params))
+            return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+        hsv = buffers.get('hsv', frame.shape)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=hsv)
+        cv2.LUT(hsv, self.get_color_lut(params), dst=hsv)
+        return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=buffers.get('output', frame.shape))
+
+    def get_resample_step(self, params):
+        """Input frames advanced per output frame in resample mode"""
+        return params['speed_factor'] * self.fps / self.output_fps
+
+    @staticmethod
+    def resample_count(index, step):
+        """How many output frames show input frame index, if output frame k shows frame floor(k * step)"""
+        def outputs_before(frame):
+            # Tolerance keeps exact multiples from rounding up
+            return math.ceil(frame / step - 1e-9)
+        return outputs_before(index + 1) - outputs_before(index)
+
+    def create_writer(self, output_path, params):
+        """Create video writer with fixed output resolution"""
+        options = dict(self.writer_options)
+        if options.pop('audio', False):
+            # Audio is sped up along with the video so the two stay in sync
+            options['audio_source'] = self.input_path
+            options['audio_tempo'] = params['speed_factor']
+        fps = self.output_fps if self.speed_mode == 'resample' else self.fps * params['speed_factor']
+        return create_writer(
+            self.writer,
+            output_path,
+            fps,
+            (self.output_width, self.output_height),
+            **options
+        )
+
+    def process_frame(self, frame, params, timer=NULL_TIMER, prescaled=False, buffers=None):
+        """Apply one variant's modifications to a decoded frame.
+
+        prescaled frames already went through this variant's geometry
+        in the reader (see open_input). With buffers (a FrameBuffers
+        owned by this variant), the result is built in reused arrays
+        and is only valid until the next call.
+        """
+        # Resize, zoom and border geometry in a single resample
+        if not prescaled:
+            with timer.stage('geometry'):
+                frame = self.apply_geometry(frame, params, buffers)
+
+        # Apply color modifications
+        if self.use_color:
+            with timer.stage('color'):
+                frame = self.apply_color(frame, params, buffers)
+
+        # Apply border
+        if self.use_border and params['border_size'] > 0:
+            with timer.stage('border'):
+                frame = self.apply_border(frame, params)
+
+        return frame
+
+    def open_input(self, params=None):
+        """Open a reader on the input video.
+
+        Given one variant's params and the ffmpeg backend, the decoder
+        also applies that variant's geometry: crop, scale to the content
+        area and pad to the output size, leaving the border strips for
+        apply_border. Full-resolution frames never reach this process.
+        """
+        if params is not None and self.reader == 'ffmpeg':
+            rect, insets = self.get_geometry_for_size(self.input_width, self.input_height, params)
+            return open_reader('ffmpeg', self.input_path, size=self.get_content_size(insets), crop=rect,
+                               pad=insets, threads=self.reader_threads)
+        return open_reader(self.reader, self.input_path, threads=self.reader_threads)
+
+    def read_frame(self):
+        """Decode the next frame, or return None at the end of the stream.
+
+        In buffer pool mode every frame is decoded into the same array.
+        """
+        if self.buffers is None:
+            return self.cap.read()
+        width, height = self.cap.output_size
+        frame = self.buffers.get('decode', (height, width, 3))
+        return frame if self.cap.read_into(frame) else None
+
+    def run_frames(self, transform, write, timer=NULL_TIMER, end_frame=None, repeats=None):
+        """Decode every frame, transform it and hand the result to write.
+
+        In pipelined mode decoding, transforming and encoding run on
+        separate threads; otherwise they run in sequence on this one.
+        Reading starts at the reader's position and stops before
+        end_frame, if given. Decode time and frame count go to timer.
+
+        With repeats, repeats(index) gives the number of times each
+        output shows input frame index, as a tuple of counts. Frames no
+        output shows are skipped with grab() and never transformed; the
+        rest go through transform(frame, counts) and write(result,
+        counts), and write counts the frames it writes.
+        """
+        start_frame = self.cap.position
+        total_frames = max((end_frame if end_frame is not None else self.frame_count) - start_frame, 1)
+
+        def read_frame():
+            while True:
+                index = self.cap.position
+                if end_frame is not None and index >= end_frame:
+                    return None
+                counts = repeats(index) if repeats else None
+                if counts is None or any(counts):
+                    break
+                with timer.stage('skip'):
+                    if not self.cap.grab():
+                        return None
+            with timer.stage('decode'):
+                frame = self.read_frame()
+            return None if frame is None else (index, frame, counts)
+
+        def transform_frame(item):
+            index, frame, counts = item
+            return index, transform(frame) if counts is None else transform(frame, counts), counts
+
+        def write_and_report(item):
+            index, result, counts = item
+            if counts is None:
+                write(result)
+                timer.count_frame()
+            else:
+                write(result, counts)
+
+            # Update progress
+            if self.progress_callback:
+                progress = ((index + 1 - start_frame) / total_frames) * 100
+                self.progress_callback(progress)
+
+        if self.pipelined:
+            FramePipeline(
+                read_frame,
+                transform_frame,
+                write_and_report,
+                transform_workers=self.transform_workers,
+                cancel_event=self.cancel_event
+            ).run()
+            return
+
+        while not self.is_cancelled():
+            item = read_frame()
+            if item is None:
+                break
+            write_and_report(transform_frame(item))
+
+    def generate_modified_video(self, output_path, params=None, frame_range=None):
+        """Render one variant; frame_range (start, end) limits it to part of the input"""
+        if params is None:
+            params = self.generate_variant_params()
+        start_frame, end_frame = frame_range or (0, None)
+
+        timer = StageTimer()
+        prescaled = self.reader == 'ffmpeg'
+        if prescaled:
+            # Let the decoder do this variant's crop and scale
+            self.cap.release()
+            self.cap = self.open_input(params)
+        if start_frame:
+            with timer.stage('seek'):
+                self.cap.seek(start_frame)
+        # Only complete renders get the final name, so a rerun never takes a truncated file as done
+        partial = partial_path(output_path)
+        out = self.create_writer(partial, params)
+
+        def transform(frame, counts=None):
+            return self.process_frame(frame, params, timer, prescaled, self.buffers)
+
+        def write(frame, counts=None):
+            if counts is None:
+                with timer.stage('encode'):
+                    out.write(frame)
+                return
+            # Resampled: the frame was transformed once and is written as often as the timeline shows it
+            for _ in range(counts[0]):
+                with timer.stage('encode'):
+                    out.write(frame)
+                timer.count_frame()
+
+        repeats = None
+        if self.speed_mode == 'resample':
+            step = self.get_resample_step(params)
+            repeats = lambda index: (self.resample_count(index, step),)
+
+        try:
+            try:
+                self.run_frames(transform, write, timer, end_frame, repeats)
+            finally:
+                self.cap.release()
+                out.release()
+            self.metrics[output_path] = timer.summary()
+            if not self.is_cancelled():
+                os.replace(partial, output_path)
+        finally:
+            remove_if_exists(partial)
+
+    def generate_versions_single_pass(self, output_paths, variant_params):
+        """Decode the input once and fan each frame out to every variant"""
+        partials = [partial_path(output_path) for output_path in output_paths]
+        variants = [
+            (params, self.create_writer(partial, params), StageTimer(),
+             FrameBuffers() if self.buffer_pool else None)
+            for partial, params in zip(partials, variant_params)
+        ]
+        decode_timer = StageTimer()
+
+        # Decoded frame is shared by all variants; each builds its result in its own buffers.
+        # When resampling, variants that don't show the frame skip it (count 0)
+        def transform(frame, counts=None):
+            return [
+                self.process_frame(frame, params, timer, buffers=buffers) if count else None
+                for (params, _, timer, buffers), count in zip(variants, counts or (1,) * len(variants))
+            ]
+
+        def write(frames, counts=None):
+            for (_, out, timer, _), frame, count in zip(variants, frames, counts or (1,) * len(variants)):
+                for _ in range(count):
+                    with timer.stage('encode'):
+                        out.write(frame)
+                    timer.count_frame()
+
+        repeats = None
+        if self.speed_mode == 'resample':
+            steps = [self.get_resample_step(params) for params in variant_params]
+            repeats = lambda index: tuple(self.resample_count(index, step) for step in steps)
+
+        self.cap = self.open_input()
+        try:
+            try:
+                self.run_frames(transform, write, decode_timer, repeats=repeats)
+            finally:
+                self.cap.release()
+                for _, out, _, _ in variants:
+                    out.release()
+
+            # Every variant reports the shared decode cost of the pass
+            decode_stages = decode_timer.summary()['stages']
+            for output_path, (_, _, timer, _) in zip(output_paths, variants):
+                summary = timer.summary()
+                summary['stages'].update(decode_stages)
+                self.metrics[output_path] = summary
+
+            if not self.is_cancelled():
+                for partial, output_path in zip(partials, output_paths):
+                    os.replace(partial, output_path)
+        finally:
+            for partial in partials:
+                remove_if_exists(partial)
+
+    def generate_versions_parallel(self, output_paths, variant_params, workers):
+        """Render each version in its own process, aggregating progress across workers"""
+        num_versions = len(output_paths)
+        settings = self.get_settings()
+        progress = [0.0] * num_versions
+
+        def handle_event(kind, index, value):
+            if kind == 'started' and self.status_callback:
+                self.status_callback(f"Generating version {index+1}...")
+            elif kind == 'progress':
+                progress[index] = value
+                if self.progress_callback:
+                    self.progress_callback(sum(progress) / num_versions)
+            elif kind == 'finished' and self.status_callback:
+                self.status_callback(f"Version {index+1} finished")
+
+        def handle_done(index, result):
+            self.metrics[result['output_path']] = result['metrics']
+
+        jobs = [
+            (settings, output_path, params)
+            for output_path, params in zip(output_paths, variant_params)
+        ]
+        run_render_jobs(jobs, workers, self.cancel_event, handle_event, handle_done)
+
+    def plan_segments(self, segments):
+        """Split the input into up to segments frame ranges (start, end) that begin on keyframes.
+
+        Boundaries are snapped to the nearest keyframe so every worker
+        starts decoding without discarding frames. Without keyframe
+        information the split is even, which is still exact since
+        seeking is frame-accurate. The last range is open-ended.
+        """
+        keyframes = keyframe_indices(self.input_path, self.fps)
+        boundaries = [0]
+        for index in range(1, segments):
+            target = round(index * self.frame_count / segments)
+            if keyframes:
+                target = min(keyframes, key=lambda keyframe: abs(keyframe - target))
+            if boundaries[-1] < target < self.frame_count:
+                boundaries.append(target)
+        return list(zip(boundaries, boundaries[1:] + [None]))
+
+    def generate_segmented_video(self, output_path, params, segments, workers, segment_callback=None):
+        """Render one variant as segments on a process pool, then join them without re-encoding.
+
+        Needs ffmpeg for the join. segment_callback(index, progress) is
+        called with each segment's own progress; progress_callback gets
+        the overall figure, and status_callback a line with every
+        segment's progress at most once per SEGMENT_STATUS_INTERVAL.
+        Audio, if requested, is added at the join.
+        """
+        ranges = self.plan_segments(segments)
+        output = Path(output_path)
+        segment_paths = [
+            str(output.with_name(f".{output.stem}.part{index:03d}{output.suffix}"))
+            for index in range(len(ranges))
+        ]
+        partial = partial_path(output_path)
+
+        settings = self.get_settings()
+        settings['writer_options'] = {
+            key: value for key, value in self.writer_options.items() if key != 'audio'
+        }
+
+        lengths = [(end if end is not None else self.frame_count) - start for start, end in ranges]
+        progress = [0.0] * len(ranges)
+        segment_metrics = [None] * len(ranges)
+        last_status = [time.monotonic()]
+
+        def report_segments():
+            now = time.monotonic()
+            if now - last_status[0] >= SEGMENT_STATUS_INTERVAL:
+                last_status[0] = now
+                self.status_callback("Segments: " + " ".join(f"{value:.0f}%" for value in progress))
+
+        def handle_event(kind, index, value):
+            start, end = ranges[index]
+            if kind == 'started' and self.status_callback:
+                self.status_callback(f"Segment {index + 1}/{len(ranges)} from frame {start}...")
+            elif kind == 'progress':
+                progress[index] = value
+                if segment_callback:
+                    segment_callback(index, value)
+                if self.progress_callback:
+                    self.progress_callback(
+                        sum(value * length for value, length in zip(progress, lengths)) / sum(lengths))
+                if self.status_callback:
+                    report_segments()
+            elif kind == 'finished' and self.status_callback:
+                self.status_callback(f"Segment {index + 1}/{len(ranges)} finished")
+
+        def handle_done(index, result):
+            segment_metrics[index] = result['metrics']
+
+        timer = StageTimer()
+        self.cap.release()
+        jobs = [
+            (settings, segment_path, params, frame_range)
+            for segment_path, frame_range in zip(segment_paths, ranges)
+        ]
+        try:
+            run_render_jobs(jobs, min(workers, len(jobs)), self.cancel_event, handle_event, handle_done)
+            if not self.is_cancelled():
+                with timer.stage('concat'):
+                    audio = self.writer_options.get('audio', False)
+                    concat_segments(
+                        segment_paths,
+                        partial,
+                        audio_source=self.input_path if audio else None,
+                        audio_tempo=params['speed_factor']
+                    )
+                os.replace(partial, output_path)
+        finally:
+            for path in segment_paths + [partial]:
+                remove_if_exists(path)
+
+        join = timer.summary()
+        summary = combine_summaries([metrics for metrics in segment_metrics if metrics], join['wall_s'])
+        summary['stages'].update(join['stages'])
+        summary['segments'] = [
+            {'start_frame': start, 'end_frame': end, 'metrics': metrics}
+            for (start, end), metrics in zip(ranges, segment_metrics)
+        ]
+        self.metrics[output_path] = summary
+
+    def generate_multiple_versions(self, num_versions=5, single_pass=False, workers=1,
+                                   output_dir=None, segments=1, seed=None, segment_callback=None):
+        """Generate num_versions variants and return their output paths and parameters.
+
+        Parameters are derived from seed (a random one when omitted; it
+        is kept in self.plan and the manifest), and outputs are named by
+        a hash of the source and parameters, so variants already present
+        in output_dir are not rendered again. With segments > 1,
+        versions are rendered one after another, each split into
+        segments spread over the workers; segment_callback(version,
+        index, progress) follows each segment of each version.
+        """
+        # Fail before rendering anything rather than at the first join
+        if segments > 1 and shutil.which('ffmpeg') is None:
+            raise RuntimeError("Segmented rendering needs ffmpeg on PATH to join the segments")
+
+        input_path = Path(self.input_path)
+        if output_dir is None:
+            output_dir = input_path.parent / "modified_versions"
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        self.plan = VariantPlan(self, output_dir, seed).build(num_versions)
+        self.plan.write_manifest()
+        pending = self.plan.pending()
+        if self.status_callback:
+            self.status_callback(f"Variant seed {self.plan.seed}")
+            if self.plan.rejected:
+                self.status_callback(f"Rejected {self.plan.rejected} duplicate variant(s)")
+            skipped = len(self.plan.variants) - len(pending)
+            if skipped:
+                self.status_callback(f"Skipping {skipped} variant(s) already in {output_dir}")
+
+        output_paths = [variant['output_path'] for variant in pending]
+        variant_params = [variant['params'] for variant in pending]
+        num_versions = len(pending)
+
+        if segments > 1:
+            for i in range(num_versions):
+                if self.is_cancelled():
+                    break
+                if self.status_callback:
+                    self.status_callback(f"Generating version {i+1} in {segments} segments...")
+                on_segment = None
+                if segment_callback:
+                    on_segment = lambda index, value, version=i: segment_callback(version, index, value)
+                self.generate_segmented_video(output_paths[i], variant_params[i], segments, workers, on_segment)
+        elif workers > 1 and num_versions > 1:
+            if self.status_callback:
+                self.status_callback(f"Generating {num_versions} versions on {workers} workers...")
+            self.generate_versions_parallel(output_paths, variant_params, min(workers, num_versions))
+        elif single_pass and num_versions:
+            if self.status_callback:
+                self.status_callback(f"Generating versions 1-{num_versions} in a single pass...")
+            self.generate_versions_single_pass(output_paths, variant_params)
+        else:
+            for i in range(num_versions):
+                if self.is_cancelled():
+                    break
+                if self.status_callback:
+                    self.status_callback(f"Generating version {i+1}...")
+                
+                # Reset video capture for each version
+                self.cap = self.open_input()
+                
+                # Generate modified version
+                self.generate_modified_video(output_paths[i], variant_params[i])
+            
+        if self.status_callback:
+            if self.is_cancelled():
+                self.status_callback("Generation cancelled")
+            else:
+                self.status_callback("All versions generated successfully!")
+
+        return [
+            {
+                'output_path': variant['output_path'],
+                'key': variant['key'],
+                'params': variant['params'],
+                'metrics': self.metrics.get(variant['output_path'])
+            }
+            for variant in self.plan.variants
+            if os.path.exists(variant['output_path'])
+        ]
+
+def run_render_jobs(jobs, workers, cancel_event, event_callback=None, done_callback=None):
+    """Run (settings, output_path, params[, frame_range]) render jobs on a process pool.
+
+    Jobs start in list order. Worker events are forwarded to
+    event_callback(kind, index, value) and finished jobs to
+    done_callback(index, result) on the calling thread, where result
+    is the worker's {'output_path', 'metrics'} dict. Setting
+    cancel_event stops running workers and drops queued jobs.
+    """
+    with multiprocessing.Manager() as manager:
+        events = manager.Queue()
+        worker_cancel_event = manager.Event()
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    render_version_worker, job[0], job[1], job[2], index, events,
+                    worker_cancel_event, job[3] if len(job) > 3 else None
+                ): index
+                for index, job in enumerate(jobs)
+            }
+
+            pending = set(futures)
+            while pending or not events.empty():
+                if cancel_event.is_set() and not worker_cancel_event.is_set():
+                    worker_cancel_event.set()
+                    for future in futures:
+                        future.cancel()
+
+                try:
+                    kind, index, value = events.get(timeout=0.1)
+                except queue.Empty:
+                    for future in [future for future in pending if future.done()]:
+                        pending.discard(future)
+                        if (done_callback and not future.cancelled()
+                                and future.exception() is None and not cancel_event.is_set()):
+                            done_callback(futures[future], future.result())
+                    continue
+
+                if event_callback:
+                    event_callback(kind, index, value)
+
+            # Surface worker errors
+            for future in futures:
+                if not future.cancelled():
+                    future.result()
+
+def render_version_worker(settings, output_path, params, index, events, cancel_event, frame_range=None):
+    """Process pool entry point: render one version (or a frame range of it) with its own reader and writer"""
+    last_reported = [-1]
+
+    def report_progress(progress):
+        # Only send whole-percent steps across the process boundary
+        if int(progress) != last_reported[0]:
+            last_reported[0] = int(progress)
+            events.put(('progress', index, progress))
+
+    events.put(('started', index, None))
+    modifier = VideoModifier(
+        progress_callback=report_progress,
+        cancel_event=cancel_event,
+        **settings
+    )
+    modifier.generate_modified_video(output_path, params, frame_range)
+    if not modifier.is_cancelled():
+        events.put(('finished', index, None))
+    return {'output_path': output_path, 'metrics': modifier.metrics.get(output_path)}